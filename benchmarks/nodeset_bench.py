@@ -0,0 +1,45 @@
+"""Benchmark of node-set operations on a large list.
+
+Run from the top-level directory of the repository::
+
+    python benchmarks/nodeset_bench.py [entries]
+
+The jukebox library contains a single artist with the given number of
+albums (10000 by default), and queries with the ``//`` abbreviation
+are evaluated on it. The best of three rounds is reported.
+"""
+
+import sys
+import timeit
+from yangson import DataModel
+from yangson.schemadata import SchemaContext
+from yangson.xpathparser import XPathParser
+
+EXPRS = [
+    "count(//album)",
+    "count(//album/name)",
+    "//album[name = 'album-42']/year",
+    "count(/jukebox/library/artist/album | //album)",
+]
+
+
+def main(entries: int = 10000):
+    dm = DataModel.from_file("yang-modules/jukebox/yang-library.json",
+                             ["yang-modules/jukebox"])
+    inst = dm.from_raw({"example-jukebox:jukebox": {"library": {"artist": [{
+        "name": "artist",
+        "album": [{"name": "album-{}".format(i), "year": 1900 + i % 100}
+                  for i in range(entries)]}]}}})
+    node = inst["example-jukebox:jukebox"]
+    sctx = SchemaContext(dm.schema_data, "example-jukebox",
+                         dm.schema_data.last_revision("example-jukebox"))
+    print("{} entries:".format(entries))
+    for expr in EXPRS:
+        ast = XPathParser(expr, sctx).parse()
+        t = min(timeit.repeat(lambda: ast.evaluate(node), number=1,
+                              repeat=3))
+        print("{:9.1f} ms  {}".format(1e3 * t, expr))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,64 @@
+"""Benchmark of operations on object values.
+
+Run from the top-level directory of the repository::
+
+    python benchmarks/objectvalue_bench.py
+
+Small objects (ten members) are compared with plain dictionaries, which
+is what they were before large objects got a trie representation. For
+large objects (the given number of members, 10000 by default), the cost
+of a copy with one modified member and of the subsequent iteration is
+reported. The best of five rounds is reported.
+"""
+
+import sys
+import timeit
+from yangson.instvalue import ObjectValue
+
+NUMBER = 100000
+
+
+def bench(stmt, number: int = NUMBER) -> float:
+    """Return the time of one execution of `stmt` in microseconds."""
+    return 1e6 * min(timeit.repeat(stmt, number=number, repeat=5)) / number
+
+
+def small():
+    raw = {"m" + str(i): i for i in range(10)}
+    for name, obj in (("dict", dict(raw)), ("ObjectValue", ObjectValue(raw))):
+        print("{}:".format(name))
+        print("{:9.3f} µs  get member".format(bench(lambda: obj["m5"])))
+        print("{:9.3f} µs  test membership".format(
+            bench(lambda: "m5" in obj)))
+        print("{:9.3f} µs  iterate".format(bench(lambda: list(obj))))
+        print("{:9.3f} µs  iterate items".format(
+            bench(lambda: list(obj.items()))))
+        print("{:9.3f} µs  copy".format(bench(lambda: obj.copy())))
+
+
+def large(members: int):
+    obj = ObjectValue({"m" + str(i): i for i in range(members)})
+    list(obj)
+
+    def modify():
+        res = obj.copy()
+        res["m5"] = 0
+        res["new"] = 1
+        return res
+
+    def modify_iter():
+        res = modify()
+        res.copy()
+        return list(res)
+    print("ObjectValue with {} members:".format(members))
+    print("{:9.3f} µs  copy and add a member".format(bench(modify, 1000)))
+    print("{:9.3f} µs  ... and iterate".format(bench(modify_iter, 100)))
+
+
+def main(members: int = 10000):
+    small()
+    large(members)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,35 @@
+"""Benchmark of parsing YANG modules.
+
+Run from the top-level directory of the repository::
+
+    python benchmarks/parse_bench.py [rounds]
+
+Every YANG module and submodule in the ``yang-modules`` directory is
+parsed with the module parser. The best of the given number of rounds
+(five by default) is reported for each file and for all of them.
+"""
+
+import glob
+import sys
+import timeit
+from yangson.statement import ModuleParser
+
+
+def main(rounds: int = 5):
+    files = sorted(glob.glob("yang-modules/*/*.yang"))
+    total = 0.0
+    size = 0
+    for fn in files:
+        with open(fn, encoding="utf-8") as infile:
+            text = infile.read()
+        t = min(timeit.repeat(lambda: ModuleParser(text).parse(), number=1,
+                              repeat=rounds))
+        total += t
+        size += len(text)
+        print("{:9.2f} ms  {:7d} chars  {}".format(1e3 * t, len(text), fn))
+    print("{:9.2f} ms  {:7d} chars  total ({:.1f} MB/s)".format(
+        1e3 * total, size, size / total / 1e6))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
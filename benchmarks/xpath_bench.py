@@ -0,0 +1,101 @@
+"""Benchmark of XPath evaluation.
+
+Run from the top-level directory of the repository::
+
+    python benchmarks/xpath_bench.py
+
+Each expression is parsed once and then evaluated repeatedly, which is
+how must, when and leafref expressions are used during validation. The
+best of five rounds is reported.
+"""
+
+import json
+import timeit
+from yangson import DataModel
+from yangson.enumerations import ContentType
+from yangson.schemadata import SchemaContext
+from yangson.xpathparser import XPathParser
+
+JUKEBOX_EXPRS = [
+    "count(/jukebox/library/artist/album/song)",
+    "sum(/jukebox/library/artist/album/song/length)",
+    "/jukebox/library/artist[name = 'artist-7']/album[year > 2000]/name",
+    "count(/jukebox/library/artist/album[genre = 'example-jukebox:jazz'])",
+    "/jukebox/player/gap * 10 + string-length(concat('a', 'b')) > 3",
+    "boolean(//song)",
+    "/jukebox/library/artist/album/song/length > 100",
+]
+
+TEST_EXPRS = [
+    ("not(leafA <= leafB)", ["test:contA"]),
+    ("count(listA[leafE = 'ABBA']/contD/contE/leafP) = 0", ["test:contA"]),
+    ("../leafB = current()/../leafB and true()", ["test:contA", "leafB"]),
+]
+
+
+def jukebox_data(artists: int = 20, albums: int = 10, songs: int = 10):
+    art = []
+    for i in range(artists):
+        alb = []
+        for j in range(albums):
+            alb.append({
+                "name": "album-{}".format(j),
+                "genre": "example-jukebox:jazz" if j % 2 else
+                "example-jukebox:rock",
+                "year": 1990 + j * 3,
+                "song": [{"name": "song-{}".format(k),
+                          "location": "/media/{}/{}/{}".format(i, j, k),
+                          "length": 100 + k}
+                         for k in range(songs)]})
+        art.append({"name": "artist-{}".format(i), "album": alb})
+    return {"example-jukebox:jukebox": {
+        "library": {"artist": art}, "player": {"gap": 0.5}}}
+
+
+TEST_DATA = {
+    "test:contA": {
+        "leafA": 11,
+        "leafB": 9,
+        "listA": [
+            {"leafE": "C0FFEE", "leafF": True,
+             "contD": {"leafG": "foo1-bar",
+                       "contE": {"leafJ": [None], "leafP": 10}}},
+            {"leafE": "ABBA", "leafW": 9, "leafF": False}],
+        "testb:leafN": "hi!",
+        "testb:leafV": 99,
+        "anydA": {"foo:bar": [1, 2, 3]}
+    }
+}
+
+
+def run(dm, module, inst, exprs, number):
+    sctx = SchemaContext(dm.schema_data, module,
+                         dm.schema_data.last_revision(module))
+    for expr, route in exprs:
+        node = inst
+        for m in route:
+            node = node[m]
+        ast = XPathParser(expr, sctx).parse()
+        t = min(timeit.repeat(lambda: ast.evaluate(node), number=number,
+                              repeat=5))
+        print("{:9.1f} us  {}".format(1e6 * t / number, expr))
+
+
+def main():
+    jdm = DataModel.from_file("yang-modules/jukebox/yang-library.json",
+                              ["yang-modules/jukebox"])
+    jinst = jdm.from_raw(jukebox_data())
+    print("jukebox ({} songs):".format(20 * 10 * 10))
+    run(jdm, "example-jukebox", jinst, [(e, ["example-jukebox:jukebox"]) for e in JUKEBOX_EXPRS], 2)
+    tdm = DataModel.from_file("yang-modules/test/yang-library.json",
+                              ["yang-modules/test", "yang-modules/ietf"])
+    tinst = tdm.from_raw(json.loads(json.dumps(TEST_DATA)))
+    print("test:")
+    run(tdm, "test", tinst, TEST_EXPRS, 5000)
+    t = min(timeit.repeat(lambda: tinst.validate(ctype=ContentType.all),
+                          number=500, repeat=5))
+    print("{:9.1f} us  validation of the test instance".format(1e6 * t / 500))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import io
 import json
+import os
+import pickle
 import pytest
+import shutil
 from decimal import Decimal
 from yangson import DataModel
 from yangson.exceptions import (
     InvalidFeatureExpression, UnknownPrefix, NonexistentInstance,
-    NonexistentSchemaNode, RawTypeError, SchemaError,
-    XPathTypeError, InvalidXPath, NotSupported)
-from yangson.instvalue import ArrayValue
+    NonexistentSchemaNode, RawMemberError, RawTypeError, SchemaError,
+    SemanticError, ValidationError, XPathTypeError, InvalidXPath, NotSupported,
+    YangTypeError, YangsonException, ModuleNotFound, UnexpectedInput)
+from yangson.instance import RootNode
+from yangson.instvalue import ArrayValue, ObjectValue, _DerivedIndex
+from yangson.jsonstream import JSONStreamParser
 from yangson.schemadata import SchemaContext, FeatureExprParser
-from yangson.enumerations import ContentType
+from yangson.statement import ModuleParser
+from yangson.enumerations import ContentType, ValidationScope
+from yangson.xpathast import _eval_cache
 from yangson.xpathparser import XPathParser
 
 tree = """+--rw (test:choiA)?
@@ -128,6 +139,22 @@ def instance(data_model):
     return data_model.from_raw(json.loads(data))
 
 
+@pytest.fixture
+def xpath(data_model):
+    def parse(expr, module="test"):
+        mid = data_model.schema_data.last_revision(module)
+        sctx = SchemaContext(data_model.schema_data, module, mid)
+        return XPathParser(expr, sctx).parse()
+    return parse
+
+
+@pytest.fixture
+def xptest(xpath, instance):
+    def check(expr, res=True, node=instance, module="test"):
+        assert xpath(expr, module).evaluate(node) == res
+    return check
+
+
 def test_schema_data(data_model):
     assert len(data_model.schema_data.implement) == 2
     assert data_model.module_set_id() == "b6d7e0614440c5ad8a7370fe46c777254d331983"
@@ -316,26 +343,22 @@ def test_instance(data_model, instance):
     assert str(lt) == "test:CC-BY"
     assert tbln.namespace == "testb"
     assert tbln.json_pointer() == "/test:contA/testb:leafN"
-    assert (instance._ancestors() == instance._preceding_siblings() ==
-            instance._following_siblings() == [])
+    assert (instance._ancestors() == list(instance._preceding_siblings()) ==
+            list(instance._following_siblings()) == [])
     axtest(instance._ancestors_or_self(), ["/"])
     axtest(la1._ancestors(False), ["/test:contA"])
     axtest(la1._ancestors_or_self(("listA", "test")), ["/test:contA/listA/1"])
     axtest(la1._preceding_siblings(), ["/test:contA/listA/0"])
     axtest(la1._following_siblings(), [])
-    assert len(conta._children()) == 10
+    assert len(list(conta._children())) == 10
     axtest(la1._children(("leafF", "test")), ["/test:contA/listA/1/leafF"])
-    assert len(instance._descendants(with_self=True)) == 32
+    assert len(list(instance._descendants(with_self=True))) == 32
     axtest(conta._descendants(("listA", "test")),
            ["/test:contA/listA/0", "/test:contA/listA/1"])
     axtest(tbln._ancestors_or_self(("leafN", "testb")), ["/test:contA/testb:leafN"])
 
 
-def test_xpath(data_model, instance):
-    def xptest(expr, res=True, node=instance, module="test"):
-        mid = data_model.schema_data.last_revision(module)
-        xpp = XPathParser(expr, SchemaContext(data_model.schema_data, module, mid))
-        assert xpp.parse().evaluate(node) == res
+def test_xpath(instance, xptest):
     conta = instance["test:contA"]
     lr = conta["testb:leafR"]
     with pytest.raises(InvalidXPath):
@@ -381,6 +404,8 @@ def test_xpath(data_model, instance):
     xptest("name(../t:listA)", "listA", lr, "testb")
     xptest("count(descendant-or-self::*)", 32)
     xptest("count(descendant::t:leafE)", 2)
+    xptest("count(//t:leafE | t:contA/t:listA/t:leafE)", 2)
+    xptest("count(//t:listA/ancestor::*)", 1)
     xptest("count(preceding-sibling::*)", 0, lr, "testb")
     xptest("count(following-sibling::*)", 0, lr, "testb")
     xptest("count(descendant-or-self::contA/descendant-or-self::contA)", 1, conta)
@@ -466,6 +491,170 @@ def test_xpath(data_model, instance):
     xptest("bit-is-set(., 'dos')", False, conta)
 
 
+def test_evaluation_cache(instance, xpath):
+    expr = xpath("count(/t:contA/t:listA)")
+    conta = instance["test:contA"]
+    with _eval_cache:
+        assert expr.evaluate(conta) == 2
+        assert expr.evaluate(conta["listA"][1]) == 2
+        mod = conta.put_member("listA", ArrayValue([conta.value["listA"][0]]))
+        assert expr.evaluate(mod) == 1
+        assert expr.evaluate(mod.top()) == 1
+        assert expr.evaluate(conta) == 2
+
+
+def test_key_predicates(instance, xpath):
+    conta = instance["test:contA"]
+    step = xpath("listA[leafE = 'ABBA'][leafF = 'false']")
+    assert step._keyed_function() is not None
+    res = step.evaluate(conta)
+    assert [n.json_pointer() for n in res] == ["/test:contA/listA/1"]
+
+    def keyed(expr, node=conta):
+        ns = xpath(expr).evaluate(node)
+        return [n.json_pointer() for n in ns]
+    assert keyed("/t:contA/t:listA[leafF = 'true'][leafE = 'C0FFEE']") == [
+        "/test:contA/listA/0"]
+    assert keyed("listA[leafE = //leafE][leafF = 'false']") == [
+        "/test:contA/listA/1"]
+    assert keyed("listA[leafE = 'ABBA'][leafF = 'true']") == []
+    assert keyed("listA[leafE = 'abba'][leafF = 'false']") == []
+    assert keyed("listA[leafE = 'ABBA'][leafF = 'false'][1]") == [
+        "/test:contA/listA/1"]
+    assert keyed("listA[leafE = 'ABBA'][leafF = 'false'][2]") == []
+    assert keyed("listA[leafE = 'ABBA'][leafF = false()]") == [
+        "/test:contA/listA/1"]
+    assert keyed("listA[leafE = 'ABBA']") == ["/test:contA/listA/1"]
+
+
+def test_lazy_nodes(instance, xpath, xptest):
+    conta = instance["test:contA"]
+    desc = instance._descendants()
+    assert next(desc).json_pointer() == "/test:llistB/0"
+    assert xpath("//leafE")._nodes_function()
+    assert xpath("listA[1]/leafE")._nodes_function() is None
+    xptest("boolean(//leafE)", node=conta)
+    xptest("not(//foo | listA/foo)", node=conta)
+    xptest("not(listA/contD)", False, conta)
+    xptest("listA/leafE = 'ABBA'", node=conta)
+    xptest("'ABBA' != listA/leafE", node=conta)
+    xptest("//leafP > 9 and //leafP < 11 and 9 < //leafP", node=conta)
+    xptest("listA/leafE = //leafE", node=conta)
+    xptest("listA/leafF = false()", node=conta)
+    xptest("listA/leafE = 'BEEF'", False, conta)
+    xptest("listA/leafF != listA/leafF", node=conta)
+    xptest("listA/foo != 'x'", False, conta)
+
+
+def test_default_overlay(instance, xptest):
+    conta = instance["test:contA"]
+    cval = conta.value
+    assert [n.json_pointer() for n in conta._children(("leafA", "test"))] == [
+        "/test:contA/leafA"]
+    assert conta.value is cval
+    xptest("leafA = 11", node=conta)
+    xptest("count(contC)", 0)
+    nob = instance.delete_item("test:llistB").top()
+    xptest("contC/leafD = 199 and count(contC/llistA) = 2", node=nob)
+    xptest("count(*)", 5, nob)
+    xptest("count(contC | leafH)", 0,
+           nob.put_member("testb:leafQ", (None,)).top())
+    xptest("count(contC/*)", 3, nob.put_member("test:leafH", "::1").top())
+
+
+def test_conditional_defaults(tmp_path):
+    (tmp_path / "grp.yang").write_text("""
+    module grp {
+      namespace "http://example.com/grp";
+      prefix g;
+      grouping grA {
+        leaf leafA {
+          type uint8;
+          default 7;
+        }
+      }
+      grouping grB {
+        case caseA {
+          leaf leafB {
+            type uint8;
+            default 5;
+          }
+        }
+        case caseB {
+          leaf leafC {
+            type uint8;
+          }
+        }
+      }
+      container contA {
+        leaf leafD {
+          type uint8;
+        }
+        uses grA {
+          when "leafD = 1";
+        }
+        container contB;
+        choice choiA {
+          default caseA;
+          uses grB {
+            when "leafD = 1";
+          }
+        }
+      }
+      augment "/contA/contB" {
+        when "../leafD = 1";
+        leaf leafE {
+          type uint8;
+          default 8;
+        }
+      }
+    }""", encoding="utf-8")
+    (tmp_path / "yang-library.json").write_text(json.dumps({
+        "ietf-yang-library:modules-state": {
+            "module-set-id": "grp",
+            "module": [{"name": "grp", "revision": "",
+                        "namespace": "http://example.com/grp",
+                        "conformance-type": "implement"}]}}))
+    dm = DataModel.from_file(str(tmp_path / "yang-library.json"),
+                             [str(tmp_path)])
+    sctx = SchemaContext(dm.schema_data, "grp",
+                         dm.schema_data.last_revision("grp"))
+
+    def counts(raw):
+        conta = dm.from_raw({"grp:contA": raw})["grp:contA"]
+        res = [XPathParser(e, sctx).parse().evaluate(conta) for e in
+               ("count(leafA)", "count(contB/leafE)", "count(leafB)",
+                "count(*)")]
+        dflt = conta.add_defaults().value
+        assert res[:3] == [int("leafA" in dflt),
+                           int("leafE" in dflt["contB"]),
+                           int("leafB" in dflt)]
+        return res
+    assert counts({"leafD": 1, "contB": {}}) == [1, 1, 1, 4]
+    assert counts({"leafD": 2, "contB": {}}) == [0, 0, 0, 2]
+    assert counts({"leafD": 1, "contB": {}, "leafC": 1}) == [1, 1, 0, 4]
+    with pytest.raises(SchemaError):
+        dm.from_raw({"grp:contA": {"leafD": 2, "leafA": 3}}).validate()
+
+
+def test_leafref_index(instance):
+    conta = instance["test:contA"]
+    lr = conta["testb:leafR"]
+    lw = conta["listA"][1]["leafW"]
+    with _eval_cache:
+        assert lr._deref()[0].json_pointer() == "/test:contA/listA/0/leafE"
+        assert lw._deref()[0].json_pointer() == "/test:contA/leafB"
+        ltype = lr.schema_node.type
+        assert ltype.path._string_index(lr) is ltype.path._string_index(
+            conta["testb:leafV"])
+        bad = conta["listA"][0].put_member("leafE", "BEEF").up().up().up()
+        assert bad["testb:leafR"]._deref() == []
+        bad = lw.update(10).top()
+        with pytest.raises(SemanticError, match="instance-required"):
+            bad.validate(ctype=ContentType.all)
+        assert lr._deref()[0].value == "C0FFEE"
+
+
 def test_instance_paths(data_model, instance):
     rid1 = data_model.parse_resource_id("/test:contA/testb:leafN")
     rid2 = data_model.parse_resource_id("/test:contA/listA=C0FFEE,true/contD/contE")
@@ -496,15 +685,426 @@ def test_edits(data_model, instance):
     assert inst1.peek(laii)[1]["leafE"] == "B00F"
     modla = la.delete_item(1)
     assert len(modla.value) == 1
+    assert la.look_up(leafE="ABBA", leafF=False).index == 1
+    la2 = la[0].update(la.value[0], raw=False).insert_after(
+        {"leafE": "BEEF", "leafF": True}, raw=True).up()
+    assert la2.value._key_index is not None
+    assert la2.look_up(leafE="ABBA", leafF=False).index == 2
+    assert la2.look_up(leafE="BEEF", leafF=True).index == 1
+    la3 = la2.delete_item(0)
+    assert la3.value._key_index is not None
+    assert la3.look_up(leafE="BEEF", leafF=True).index == 0
+    with pytest.raises(NonexistentInstance):
+        la3.look_up(leafE="C0FFEE", leafF=True)
     llb1 = instance["test:llistB"][1]
     modllb = llb1.update("2001:db8:0:2::1", raw=True).up()
     assert modllb.value == ArrayValue(["::1", "2001:db8:0:2::1"])
+    llb = instance["test:llistB"]
+    assert llb[0].next().previous().up().value is llb.value
+    assert llb[-1].insert_before("::2").up().value == ArrayValue(
+        ["::1", "::2", "127.0.0.1"])
+    assert llb[1].previous().insert_after("::3").next().up().value == (
+        ArrayValue(["::1", "::3", "127.0.0.1"]))
     with pytest.raises(RawTypeError):
         llb1.update("2001::2::1", raw=True)
 
 
+def test_key_index_edits(instance):
+    def entry(i):
+        return {"leafE": "{:06X}".format(i), "leafF": i % 2 == 0}
+
+    def check(la):
+        keys = ["leafE", "leafF"]
+        val = la.value
+        idx = val.key_index(keys)
+        assert dict(idx) == {(en["leafE"], en["leafF"]): i
+                             for i, en in enumerate(val)}
+        return idx
+    la = instance["test:contA"]["listA"].update(
+        [entry(i) for i in range(100)], raw=True)
+    check(la)
+    la = la[10].insert_before(entry(1000), raw=True).up()
+    assert isinstance(la.value._key_index[1], _DerivedIndex)
+    assert check(la)[("0003E8", True)] == 10
+    la = la.delete_item(3)
+    assert la.look_up(leafE="000063", leafF=False).index == 99
+    assert check(la)[("0003E8", True)] == 9
+    la = la[50].update(entry(2000), raw=True).up()
+    idx = check(la)
+    assert idx[("0007D0", True)] == 50 and ("000032", True) not in idx
+    assert la.value._key_index[1].depth == 3
+    for i in range(30):
+        la = la[i].insert_after(entry(3000 + i), raw=True).up()
+        assert la.value.key_index(["leafE", "leafF"])[
+            ("{:06X}".format(3000 + i), i % 2 == 0)] == i + 1
+    check(la)
+    la = la[0].update(entry(3005), raw=True).up()
+    assert la.value.key_index(["leafE", "leafF"]) is None
+
+
+def test_compiled_cookers(data_model):
+    raw = {
+        "test:llistB": ["::1", "127.0.0.1"],
+        "test:contA": {
+            "leafB": 9,
+            "listA": [
+                {"leafE": "C0FFEE", "leafF": True,
+                 "contD": {"contE": {"leafJ": [None], "leafP": 10}}},
+                {"leafE": "ABBA", "leafW": 9, "leafF": False}],
+            "anydA": {"foo:bar": [1, 2, 3]}},
+        "test:contT": {"bits": "dos cuatro", "decimal64": 4.50}}
+    inst = data_model.from_raw(raw)
+    data_model.compile_cookers()
+    assert data_model.from_raw(raw).value == inst.value
+    raw["test:contA"]["listA"][1]["leafF"] = "no"
+    with pytest.raises(RawTypeError) as ei:
+        data_model.from_raw(raw)
+    assert ei.value.path == "/test:contA/listA/2/leafF"
+    raw["test:contA"]["listA"][1]["leafF"] = False
+    raw["test:contA"]["foo"] = 1
+    with pytest.raises(RawMemberError) as ei:
+        data_model.from_raw(raw)
+    assert ei.value.path == "/test:contA/foo"
+
+
+def test_json_stream(data_model, instance):
+    text = ('{"a": [1, -2.5e-3, true, false, null, "\\u00e9\\"x"],'
+            ' "b": {}, "c": [[]], "d": 12345678901234567890}')
+    for cs in (1, 2, 3, 65536):
+        p = JSONStreamParser(io.StringIO(text), cs)
+        assert p.value() == json.loads(text)
+        p.finish()
+        p = JSONStreamParser(io.StringIO(text), cs)
+        p.skip()
+        p.finish()
+    with pytest.raises(json.JSONDecodeError) as ei:
+        JSONStreamParser(io.StringIO('[1,\n  {"a" 1}]'), 2).value()
+    assert (ei.value.lineno, ei.value.colno) == (2, 8)
+    with pytest.raises(json.JSONDecodeError) as ei:
+        JSONStreamParser(io.StringIO('{"a": [1,\n "b"'), 2).skip()
+    assert ei.value.lineno == 2
+    text = json.dumps({
+        "test:llistB": ["::1", "127.0.0.1"],
+        "test:contA": {
+            "leafB": 9,
+            "listA": [{"leafE": "ABBA", "leafF": False,
+                       "contD": {"contE": {"leafJ": [None]}}}]}})
+    inst = data_model.from_json_stream(io.StringIO(text))
+    assert inst.value == data_model.from_raw(json.loads(text)).value
+    with pytest.raises(RawTypeError) as ei:
+        data_model.from_json_stream(io.StringIO(text.replace("false", "0")))
+    assert ei.value.path == "/test:contA/listA/1/leafF"
+
+
+def test_json_output(instance):
+    out = io.StringIO()
+    instance.write_json(out, 16)
+    assert out.getvalue() == "".join(instance.json_chunks())
+    res = json.loads(out.getvalue())
+    assert res["test:contA"]["anydA"] == {"foo:bar": [1, 2, 3]}
+    assert res["test:contT"]["decimal64"] == "4.5"
+    assert res["test:contA"]["listA"][0]["contD"]["contE"]["leafJ"] == [None]
+    llb = instance["test:llistB"]
+    assert json.loads("".join(llb.json_chunks())) == llb.raw_value()
+    assert "".join(llb[1].json_chunks()) == '"127.0.0.1"'
+
+
 def test_validation(instance):
     assert instance.validate(ctype=ContentType.all) is None
     inst2 = instance.put_member("testb:leafQ", "ABBA").top()
     with pytest.raises(SchemaError):
         inst2.validate(ctype=ContentType.all)
+    conta = instance["test:contA"]
+    assert not conta["leafB"].schema_node._needs_instance
+    assert conta["testb:leafR"].schema_node._needs_instance
+    with pytest.raises(YangTypeError) as exc:
+        conta.put_member("leafB", "nine").top().validate(
+            ValidationScope.syntax, ContentType.all)
+    assert exc.value.path == "/test:contA/leafB"
+
+
+def test_unique(instance):
+    lsta = instance["test:contA"]["listA"]
+    sn = lsta.schema_node
+    with pytest.raises(SemanticError, match="data-not-unique"):
+        lsta[1].put_member("contD", ObjectValue({"leafG": "foo1-bar"})).top(
+            ).validate(ctype=ContentType.all)
+    route = sn._unique_route(
+        [("contD", "test"), ("contE", "test"), ("leafP", "test")])
+    assert [st[2:] for st in route] == [(None, True), (None, True), (42, True)]
+    en = lsta[0].value.copy()
+    assert sn._unique_value(en, route) == 10
+    contd = en["contD"] = en["contD"].copy()
+    contd["contE"] = ObjectValue()
+    assert sn._unique_value(en, route) is sn._NEEDS_INSTANCE
+    del en["contD"]
+    assert sn._unique_value(en, route) is None
+
+
+def test_pattern_automaton(instance):
+    conta = instance["test:contA"]
+    sn = conta.schema_node
+    sn._pattern_automata.clear()
+    instance.validate(ctype=ContentType.all)
+    instance.validate(ctype=ContentType.all)
+    aut, = sn._pattern_automata.values()
+    assert len(aut.states) == len(conta.value) + 1
+    assert aut.step(0, "foo") is None
+    with pytest.raises(SchemaError, match="missing-data"):
+        conta.delete_item("leafB").top().validate(ctype=ContentType.all)
+    with pytest.raises(SchemaError, match="member-not-allowed"):
+        conta.put_member("testb:leafI", 1).top().validate(
+            ctype=ContentType.all)
+    aut.max_states = 2
+    assert aut.full()
+    instance.validate(ctype=ContentType.all)
+    assert sn._pattern_automata[(ContentType.all, ())] is not aut
+
+
+def test_incremental_validation(instance):
+    conta = instance["test:contA"]
+    inst2 = conta.put_member("leafA", 11).top()
+    assert inst2.validate(ctype=ContentType.all, base=instance) is None
+    assert inst2.validate(ctype=ContentType.all, base=inst2) is None
+    inst3 = conta.put_member("leafA", 7).top()
+    with pytest.raises(SemanticError):                  # must expression
+        inst3.validate(ctype=ContentType.all, base=instance)
+    conte = conta["listA"][0]["contD"]["contE"]
+    inst3 = conte.put_member("leafP", 300).top()
+    with pytest.raises(YangTypeError):
+        inst3.validate(ctype=ContentType.all, base=instance)
+    inst4 = conta["listA"][0].put_member("leafE", "BEEF").top()
+    with pytest.raises(SemanticError):                  # dangling leafref
+        inst4.validate(ctype=ContentType.all, base=instance)
+    inst5 = conta.put_member("leafB", 10).top()
+    with pytest.raises(SemanticError):                  # leafW in listA
+        inst5.validate(ctype=ContentType.all, base=instance)
+
+
+def test_validate_all(instance):
+    assert instance.validate_all(ctype=ContentType.all) == []
+    conta = instance["test:contA"]
+    inst2 = conta.put_member("leafA", 7).top()
+    inst2 = inst2["test:contT"].put_member("decimal64", 4.555).top()
+    inst2 = inst2.put_member("testb:leafQ", "ABBA").top()
+    errs = inst2.validate_all(ctype=ContentType.all)
+    assert errs.complete
+    assert {(type(e), e.path, e.tag) for e in errs} == {
+        (SchemaError, "/", "member-not-allowed"),
+        (YangTypeError, "/test:contT/decimal64", "invalid-type"),
+        (SemanticError, "/test:contA", "must-violation")}
+    assert ([str(e) for e in inst2.validate_all(
+        ctype=ContentType.all, base=instance)] == [str(e) for e in errs])
+    errs = inst2.validate_all(ctype=ContentType.all, max_errors=2)
+    assert len(errs) == 2 and not errs.complete
+    errs = inst2.validate_all(ctype=ContentType.all, time_budget=0)
+    assert not errs.complete
+    bogus = ObjectValue({m: conta.value[m] for m in conta.value})
+    bogus["bogus"] = 3
+    inst3 = conta.update(bogus).top()
+    with pytest.raises(SchemaError):
+        inst3.validate(ctype=ContentType.all)
+    assert [(type(e), e.path, e.tag) for e in inst3.validate_all(
+        ctype=ContentType.all)] == [
+            (SchemaError, "/test:contA", "member-not-allowed")]
+    inst4 = conta.put_member("leafB", "foo").top()
+    errs = {(type(e), e.path, e.tag) for e in inst4.validate_all(
+        ctype=ContentType.config)}
+    assert (SchemaError, "/test:contA", "config member-not-allowed") in errs
+    assert YangTypeError not in {e[0] for e in errs}
+
+
+def test_parallel_validation(data_model, instance):
+    def errors(inst):
+        res = []
+        for val in (lambda: inst.validate(ctype=ContentType.all),
+                    lambda: data_model.validate_parallel(
+                        inst, pool, ctype=ContentType.all, chunk_size=1)):
+            with pytest.raises(ValidationError) as exc:
+                val()
+            res.append((type(exc.value), str(exc.value)))
+        return res
+    with data_model.validation_executor(2) as pool:
+        assert data_model.validate_parallel(
+            instance, pool, ctype=ContentType.all, chunk_size=1) is None
+        contt = instance["test:contT"]
+        e1, e2 = errors(contt.put_member("decimal64", 4.555).top())
+        assert e1 == e2 and e1[0] is YangTypeError
+        conta = instance["test:contA"]
+        e1, e2 = errors(conta.put_member("leafA", 7).top())
+        assert e1 == e2 and e1[0] is SemanticError
+
+
+def test_schema_cache(tmp_path, monkeypatch, data_model, instance):
+    ylib = "yang-modules/test/yang-library.json"
+    mpath = ["yang-modules/test", "yang-modules/ietf"]
+    cache = str(tmp_path / "schema.cache")
+    ylval = json.loads(open(ylib).read())
+    dm = DataModel.from_cache(ylib, cache, mpath)
+    assert dm.ascii_tree() == data_model.ascii_tree()
+    cdm = DataModel.from_cache(ylib, cache, mpath, "Cached")
+    assert cdm.schema.description == "Cached"
+    cdm.save_cache(cache)
+    assert DataModel.from_cache(ylib, cache, mpath).schema.description == (
+        data_model.schema.description)
+    assert cdm.module_set_id() == data_model.module_set_id()
+    assert cdm.ascii_tree() == tree
+    cdm.schema.description = dm.schema.description
+    assert cdm.schema_digest() == dm.schema_digest()
+    inst = RootNode(instance.value, cdm.schema, instance.timestamp)
+    assert inst.validate(ctype=ContentType.all) is None
+    conta = inst["test:contA"]
+    with pytest.raises(SemanticError):
+        conta.put_member("leafA", 7).top().validate(ctype=ContentType.all)
+    assert DataModel._load_cache(cache, ylval, mpath) is not None
+    assert DataModel._load_cache(cache, ylval, mpath[:1]) is None
+    ylval["ietf-yang-library:modules-state"]["module"][0]["feature"] = []
+    assert DataModel._load_cache(cache, ylval, mpath) is None
+    ylval = json.loads(open(ylib).read())
+    mdir = tmp_path / "modules"
+    mdir.mkdir()
+    for d in mpath:
+        for f in os.listdir(d):
+            shutil.copy(os.path.join(d, f), str(mdir))
+    tpath = [str(mdir)]
+    DataModel.from_cache(ylib, cache, tpath)
+    assert DataModel._load_cache(cache, ylval, tpath) is not None
+    with open(str(mdir / "defs@2016-04-26.yang"), "a") as f:
+        f.write("// changed")
+    assert DataModel._load_cache(cache, ylval, tpath) is None
+    DataModel.from_cache(ylib, cache, tpath)
+    assert DataModel._load_cache(cache, ylval, tpath) is not None
+    monkeypatch.setattr(DataModel, "_package_digest", staticmethod(lambda: "0"))
+    assert DataModel._load_cache(cache, ylval, tpath) is None
+
+
+def test_parallel_loading(tmp_path, data_model):
+    ylib = "yang-modules/test/yang-library.json"
+    mpath = ["yang-modules/test", "yang-modules/ietf"]
+    ylval = json.loads(open(ylib).read())
+    mdir = tmp_path / "modules"
+    mdir.mkdir()
+    for d in mpath:
+        for f in os.listdir(d):
+            shutil.copy(os.path.join(d, f), str(mdir))
+
+    def errors(ylv, mp):
+        res = []
+        for exe in (None, pool):
+            with pytest.raises(YangsonException) as exc:
+                DataModel(json.dumps(ylv), mp, executor=exe)
+            res.append((type(exc.value), str(exc.value)))
+        return res
+    with ProcessPoolExecutor(2) as pool:
+        dm = DataModel.from_file(ylib, mpath, executor=pool)
+        sd = dm.schema_data
+        assert sd._module_sequence == data_model.schema_data._module_sequence
+        assert sd._module_files == data_model.schema_data._module_files
+        assert dm.ascii_tree() == tree
+        e1, e2 = errors(ylval, mpath[:1])
+        assert e1 == e2 and e1[0] is ModuleNotFound
+        with open(str(mdir / "defs@2016-04-26.yang"), "a") as f:
+            f.write("}")
+        e1, e2 = errors(ylval, [str(mdir)])
+        assert e1 == e2 and e1[0] is UnexpectedInput
+        ylval["ietf-yang-library:modules-state"]["module"][1]["revision"] = ""
+        e1, e2 = errors(ylval, mpath)
+        assert e1 == e2 and e1[0] is ModuleNotFound
+
+
+def test_module_index(tmp_path, data_model):
+    sd = data_model.schema_data
+    assert sd._dir_index == {}
+    assert sd._module_candidates("defs", "2016-04-26") == [
+        "yang-modules/test/defs@2016-04-26.yang"]
+    assert sd._module_candidates("testb", "") == ["yang-modules/test/testb.yang"]
+    assert sd._module_candidates("foo", "") == []
+    assert "testb.yang" in sd._dir_index["yang-modules/test"]
+    dtxt = open("yang-modules/test/defs@2016-04-26.yang").read()
+    assert ModuleParser(dtxt).header() == ("defs", "2016-04-26")
+    assert ModuleParser("module x { prefix x; }").header() == ("x", None)
+    with pytest.raises(UnexpectedInput):
+        ModuleParser("container x;").header()
+    mdir = tmp_path / "modules"
+    mdir.mkdir()
+    (mdir / "defs.yang").write_text(
+        dtxt.replace("2016-04-26", "2000-01-01") + "}", encoding="utf-8")
+    dm = DataModel.from_file(
+        "yang-modules/test/yang-library.json",
+        [str(mdir), "yang-modules/test", "yang-modules/ietf"])
+    assert dm.schema_data._module_files[("defs", "2016-04-26")] == (
+        "yang-modules/test/defs@2016-04-26.yang")
+
+
+def test_xpath_dependencies(data_model):
+    def paths(nodes):
+        return {n.data_path() for n in nodes}
+    conta = data_model.get_data_node("/test:contA")
+    assert paths(conta.xpath_dependencies()) == {
+        "/test:contA/leafA", "/test:contA/leafB"}
+    leafw = data_model.get_data_node("/test:contA/listA/leafW")
+    assert paths(leafw.xpath_dependencies()) == {"/test:contA/leafB"}
+    leafp = data_model.get_data_node("/test:contA/listA/contD/contE/leafP")
+    assert paths(leafp.xpath_dependencies()) == {
+        "/test:contA/listA/contD/contE/leafU"}
+    leafe = data_model.get_data_node("/test:contA/listA/leafE")
+    assert paths(leafe.xpath_dependents()) == {"/test:contA/testb:leafR"}
+    leafs = data_model.get_data_node("/test:contA/testb:leafS")
+    assert leafs.xpath_dependencies() == {data_model.schema}
+    leafb = data_model.get_data_node("/test:contA/leafB")
+    assert paths(leafb.xpath_dependents()) == {
+        "/test:contA", "/test:contA/listA/leafW"}
+
+
+def test_object_value():
+    raw = {"m" + str(i): i for i in range(1000)}
+    obj = ObjectValue(raw)
+    assert len(obj) == 1000
+    assert list(obj) == list(raw)
+    oc = obj.copy()
+    del oc["m10"]
+    oc["m5"] = 55
+    oc["foo"] = 0
+    assert obj["m5"] == 5 and oc["m5"] == 55
+    assert "m10" in obj and "m10" not in oc
+    assert list(oc)[5] == "m5" and list(oc)[-1] == "foo"
+    assert obj == ObjectValue(raw) and obj != oc
+    for i in range(990):
+        oc.pop("m" + str(i), None)
+    assert list(oc) == ["m" + str(i) for i in range(990, 1000)] + ["foo"]
+    assert not isinstance(oc, dict) and isinstance(oc.copy(), dict)
+    assert dict(oc) == dict(oc.items()) and oc.copy() == oc
+    small = ObjectValue({"a": 1})
+    assert isinstance(small, dict) and small.copy() == small
+    oc2 = obj.copy()
+    oc2["bar"] = 1
+    oc3 = oc2.copy()
+    assert oc3._order is oc2._order and oc2._order.keys is None
+    assert list(oc3) == list(raw) + ["bar"]
+    assert oc2._order.keys is not None
+    for i in range(200):
+        oc3["x" + str(i)] = i
+        del oc3["m" + str(i)]
+    assert list(oc3) == ["m" + str(i) for i in range(200, 1000)] + [
+        "bar"] + ["x" + str(i) for i in range(200)]
+    assert pickle.loads(pickle.dumps(oc3)) == oc3
+    assert list(pickle.loads(pickle.dumps(oc3))) == list(oc3)
+    for i in range(22):
+        small["b" + str(i)] = i
+        small["c" + str(i)] = i
+    assert isinstance(small.copy(), dict) and len(small) == 45
+    big = ObjectValue(dict(small))
+    assert not isinstance(big, dict) and big == small
+    for val in (big.copy(), ObjectValue(big), copy.copy(big),
+                copy.deepcopy(big), pickle.loads(pickle.dumps(big))):
+        assert val == big and list(val) == list(small)
+    assert json.dumps(dict(big)) == json.dumps({**big}) == json.dumps(small)
+
+
+def test_large_object_output(instance):
+    raw = {"foo:m" + str(i): i for i in range(40)}
+    anyd = instance["test:contA"]["anydA"].update(raw, raw=True)
+    assert len(anyd.value) == 40 and not isinstance(anyd.value, dict)
+    out = io.StringIO()
+    anyd.top().write_json(out)
+    assert json.loads(out.getvalue())["test:contA"]["anydA"] == raw
@@ -29,6 +29,7 @@ from yangson.exceptions import (
     BadYangLibraryData, FeaturePrerequisiteError, MultipleImplementedRevisions,
     ModuleNotFound, ModuleNotRegistered, RawMemberError, RawTypeError,
     SchemaError, SemanticError)
+from yangson.jsonstream import JSONStreamParser
 
 
 def main(ylib: str = None, path: List[str] = ["."],
@@ -115,13 +116,18 @@ def main(ylib: str = None, path: List[str] = ["."],
         return 0
     try:
         with open(args.validate, encoding="utf-8") as infile:
-            itxt = json.load(infile)
+            try:
+                i = dm.from_json_stream(infile)
+            except (RawMemberError, RawTypeError):
+                infile.seek(0)      # syntax errors take precedence
+                jsp = JSONStreamParser(infile)
+                jsp.skip()
+                jsp.finish()
+                raise
     except (FileNotFoundError, PermissionError,
             json.decoder.JSONDecodeError) as e:
         print("Instance data:", str(e), file=sys.stderr)
         return 1
-    try:
-        i = dm.from_raw(itxt)
     except RawMemberError as e:
         print("Illegal object member:", str(e), file=sys.stderr)
         return 3
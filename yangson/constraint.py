@@ -57,14 +57,17 @@ class Intervals(Constraint):
                  parser: Callable[[str], Optional[Number]] = None,
                  error_tag: str = None, error_message: str = None):
         """Initialize the class instance."""
-        def _pint(x):                     # default parser
-            try:
-                return int(x)
-            except ValueError:
-                return None
         super().__init__(error_tag, error_message)
         self.intervals = intervals
-        self.parser = parser if parser else _pint
+        self.parser = parser if parser else self._parse_int
+
+    @staticmethod
+    def _parse_int(x: str) -> Optional[int]:
+        """Default parser of interval bounds."""
+        try:
+            return int(x)
+        except ValueError:
+            return None
 
     def __contains__(self, value: Number):
         """Return ``True`` if the receiver contains the value."""
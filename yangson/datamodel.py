@@ -22,16 +22,38 @@ This module implements the following class:
 * DataModel: Basic entry point to the YANG data model.
 """
 
+from concurrent.futures import Executor, ProcessPoolExecutor
 import hashlib
 import json
-from typing import List, Optional
-from .enumerations import ContentType
-from .exceptions import BadYangLibraryData
-from .instance import (InstanceRoute, InstanceIdParser, ResourceIdParser,
-                       RootNode)
+import os
+import pickle
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+from .enumerations import ContentType, ValidationScope
+from .exceptions import (BadYangLibraryData, RawDataError, ValidationError,
+                         YangsonException)
+from .instance import (InstanceNode, InstanceRoute, InstanceIdParser,
+                       ResourceIdParser, RootNode)
+from .instvalue import ArrayValue, ObjectValue, Value
+from .jsonstream import JSONStreamParser
 from .schemadata import SchemaData, SchemaContext
-from .schemanode import DataNode, SchemaTreeNode, RawObject, SchemaNode
-from .typealiases import DataPath, SchemaPath
+from .schemanode import (ContainerNode, DataNode, InternalNode, ListNode,
+                         SchemaTreeNode, RawObject, SchemaNode)
+from .typealiases import DataPath, InstanceName, SchemaPath
+from .xpathast import _eval_cache
+
+DataPart = Tuple[List[InstanceName], Value, bool]
+"""Part of a data tree that can be validated independently.
+
+The items are the route of instance names leading to the part, its value,
+and a flag indicating that the value is a chunk of list entries.
+"""
+
+_CACHE_FORMAT = b"yangson-schema-cache 1\n"
+"""First line of schema cache files.
+
+The number has to be incremented whenever a change in the schema
+classes makes older cache files unusable.
+"""
 
 
 class DataModel:
@@ -39,13 +61,41 @@ class DataModel:
 
     @classmethod
     def from_file(cls, name: str, mod_path: List[str] = ["."],
-                  description: str = None) -> "DataModel":
+                  description: str = None,
+                  executor: Executor = None) -> "DataModel":
         """Initialize the data model from a file with YANG library data.
 
         Args:
             name: Name of a file with YANG library data.
             mod_path: List of directories where to look for YANG modules.
             description:  Optional description of the data model.
+            executor: Optional executor in which YANG modules are parsed.
+
+        Returns:
+            The data model instance.
+
+        Raises:
+            The same exceptions as the class constructor above.
+        """
+        with open(name, encoding="utf-8") as infile:
+            yltxt = infile.read()
+        return cls(yltxt, mod_path, description, executor)
+
+    @classmethod
+    def from_cache(cls, name: str, cache: str, mod_path: List[str] = ["."],
+                   description: str = None,
+                   executor: Executor = None) -> "DataModel":
+        """Initialize the data model from a schema cache file.
+
+        If the cache file doesn't exist or is out of date, the data model
+        is built from YANG modules, and the cache file is (re)written.
+
+        Args:
+            name: Name of a file with YANG library data.
+            cache: Name of the cache file.
+            mod_path: List of directories where to look for YANG modules.
+            description:  Optional description of the data model.
+            executor: Optional executor in which YANG modules are parsed.
 
         Returns:
             The data model instance.
@@ -55,16 +105,112 @@ class DataModel:
         """
         with open(name, encoding="utf-8") as infile:
             yltxt = infile.read()
-        return cls(yltxt, mod_path, description)
+        try:
+            yang_library = json.loads(yltxt)
+        except json.JSONDecodeError as e:
+            raise BadYangLibraryData(str(e)) from None
+        res = cls._load_cache(cache, yang_library, mod_path)
+        if res is None:
+            res = cls(yltxt, mod_path, description, executor)
+            try:
+                res.save_cache(cache)
+            except OSError:
+                pass
+        else:
+            res._set_description(description)
+        return res
+
+    @classmethod
+    def _load_cache(cls, cache: str, yang_library: Dict[str, Any],
+                    mod_path: List[str]) -> Optional["DataModel"]:
+        """Load the data model from a cache file if it is up to date."""
+        try:
+            with open(cache, "rb") as infile:
+                if infile.readline() != _CACHE_FORMAT:
+                    return None
+                head = pickle.load(infile)
+                if (head["yangson"] != cls._package_digest() or
+                        head["yang-library"] != cls._library_digest(
+                            yang_library) or
+                        head["mod-path"] != list(mod_path)):
+                    return None
+                for fn, dig in head["files"].items():
+                    if cls._file_digest(fn) != dig:
+                        return None
+                res = pickle.load(infile)
+        except (OSError, EOFError, AttributeError, ImportError, KeyError,
+                pickle.UnpicklingError):
+            return None
+        return res if isinstance(res, cls) else None
+
+    def save_cache(self, cache: str) -> None:
+        """Save the receiver's schema to a cache file.
+
+        The data model can then be loaded with :meth:`from_cache` without
+        parsing YANG modules.
+
+        Args:
+            cache: Name of the cache file.
+
+        Raises:
+            OSError: If the cache file cannot be written.
+        """
+        head = {
+            "yangson": self._package_digest(),
+            "module-set-id": self.module_set_id(),
+            "yang-library": self._library_digest(self.yang_library),
+            "mod-path": list(self.schema_data.module_search_path),
+            "files": {fn: self._file_digest(fn) for fn in
+                      self.schema_data._module_files.values()}}
+        tmp = "{}.{}".format(cache, os.getpid())
+        try:
+            with open(tmp, "wb") as outfile:
+                outfile.write(_CACHE_FORMAT)
+                pickle.dump(head, outfile, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(self, outfile, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @staticmethod
+    def _package_digest() -> str:
+        """Return a hash of the source files of the yangson package.
+
+        Cache files written by a different version of the package are
+        thus never used.
+        """
+        pkgdir = os.path.dirname(os.path.abspath(__file__))
+        res = hashlib.sha1()
+        for fn in sorted(os.listdir(pkgdir)):
+            if fn.endswith(".py"):
+                res.update(fn.encode("utf-8"))
+                with open(os.path.join(pkgdir, fn), "rb") as infile:
+                    res.update(infile.read())
+        return res.hexdigest()
+
+    @staticmethod
+    def _library_digest(yang_library: Dict[str, Any]) -> str:
+        """Return a hash of YANG library data."""
+        return hashlib.sha1(json.dumps(
+            yang_library, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _file_digest(fn: str) -> str:
+        """Return a hash of the contents of file `fn`."""
+        with open(fn, "rb") as infile:
+            return hashlib.sha1(infile.read()).hexdigest()
 
     def __init__(self, yltxt: str, mod_path: List[str] = ["."],
-                 description: str = None):
+                 description: str = None, executor: Executor = None):
         """Initialize the class instance.
 
         Args:
             yltxt: JSON text with YANG library data.
             mod_path: List of directories where to look for YANG modules.
             description: Optional description of the data model.
+            executor: Optional executor (such as a process pool) in which
+                YANG modules are read and parsed.
 
         Raises:
             BadYangLibraryData: If YANG library data is invalid.
@@ -81,13 +227,32 @@ class DataModel:
             self.yang_library = json.loads(yltxt)
         except json.JSONDecodeError as e:
             raise BadYangLibraryData(str(e)) from None
-        self.schema_data = SchemaData(self.yang_library, mod_path)
+        self.schema_data = SchemaData(self.yang_library, mod_path, executor)
+        self._cooker = None
         self._build_schema()
+        self._set_description(description)
+
+    def _set_description(self, description: Optional[str]) -> None:
+        """Set the description of the receiver's schema.
+
+        Args:
+            description: Description of the data model. If it is
+                ``None``, a default based on YANG library data is used.
+        """
         self.schema.description = description if description else (
             "Data model ID: " +
             self.yang_library["ietf-yang-library:modules-state"]
             ["module-set-id"])
 
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the receiver's state for pickling.
+
+        Compiled cookers are left out, see :meth:`compile_cookers`.
+        """
+        res = self.__dict__.copy()
+        res["_cooker"] = None
+        return res
+
     def module_set_id(self) -> str:
         """Compute unique id of YANG modules comprising the data model.
 
@@ -106,9 +271,113 @@ class DataModel:
         Returns:
             Root instance node.
         """
-        cooked = self.schema.from_raw(robj)
+        if self._cooker:
+            try:
+                cooked = self._cooker(robj)
+            except RawDataError:
+                cooked = self.schema.from_raw(robj)
+        else:
+            cooked = self.schema.from_raw(robj)
+        return RootNode(cooked, self.schema, cooked.timestamp)
+
+    def from_json_stream(self, fileobj: TextIO) -> RootNode:
+        """Create an instance node from JSON text read from a file.
+
+        The JSON text is parsed incrementally and transformed into the
+        cooked form on the fly, so that no raw data tree is built.
+
+        Args:
+            fileobj: File object opened in text mode.
+
+        Returns:
+            Root instance node.
+
+        Raises:
+            JSONDecodeError: If the JSON text is invalid.
+            RawMemberError: If a member isn't defined in the schema.
+            RawTypeError: If a value is of incorrect type.
+        """
+        parser = JSONStreamParser(fileobj)
+        cooked = self.schema._from_stream(parser, "")
+        parser.finish()
         return RootNode(cooked, self.schema, cooked.timestamp)
 
+    def compile_cookers(self) -> None:
+        """Prepare specialized functions for transforming raw data trees.
+
+        Subsequent calls of :meth:`from_raw` then use functions in which
+        all child lookups and type converters are bound in advance.
+        JSON pointers are only constructed if the raw data is invalid.
+        """
+        self._cooker = self.schema._cooker()
+
+    def validation_executor(
+            self, max_workers: int = None) -> ProcessPoolExecutor:
+        """Create a pool of processes for parallel validation.
+
+        The data model is pickled and sent to every worker process upon
+        its start, so that the workers needn't parse YANG modules.
+
+        Args:
+            max_workers: Number of worker processes (by default, the
+                number of processors).
+
+        Returns:
+            Executor to be used with :meth:`validate_parallel`.
+        """
+        return ProcessPoolExecutor(
+            max_workers, initializer=_init_worker,
+            initargs=(pickle.dumps(self, pickle.HIGHEST_PROTOCOL),))
+
+    def validate_parallel(self, inst: InstanceNode, executor: Executor,
+                          scope: ValidationScope = ValidationScope.all,
+                          ctype: ContentType = ContentType.config,
+                          chunk_size: int = 1000) -> None:
+        """Validate an instance, distributing parts of it to workers.
+
+        Top-level members and chunks of entries of large lists (reachable
+        through containers) are validated in the worker processes if
+        their constraints don't read data outside them. The rest of the
+        data tree is validated in the calling process at the same time.
+        If a violation is found, the offending parts are validated once
+        more in the calling process, so that the exception raised is the
+        same as from :meth:`.InstanceNode.validate`.
+
+        Args:
+            inst: Root instance node to be validated.
+            executor: Executor returned by :meth:`validation_executor`.
+            scope: Scope of the validation (syntax, semantics or all).
+            ctype: Receiver's content type.
+            chunk_size: Number of list entries in one part.
+
+        Raises:
+            SchemaError: If the value doesn't conform to the schema.
+            SemanticError: If the value violates a semantic constraint.
+            YangTypeError: If the value is a scalar of incorrect type.
+        """
+        parts = []
+        if isinstance(inst, RootNode):
+            self._partition(inst.value, self.schema, [], chunk_size, parts)
+        if not parts:
+            inst.validate(scope, ctype)
+            return
+        futs = [executor.submit(_validate_part, p, scope, ctype)
+                for p in parts]
+        with _eval_cache:
+            try:
+                self.schema._validate(inst, scope, ctype,
+                                      self._skeleton(parts))
+                err = None
+            except ValidationError as e:
+                err = e
+            oks = [f.result() for f in futs]
+            if all(oks):
+                if err:
+                    raise err
+                return
+            self.schema._validate(inst, scope, ctype, self._skeleton(
+                [p for p, ok in zip(parts, oks) if ok]))
+
     def get_schema_node(self, path: SchemaPath) -> Optional[SchemaNode]:
         """Return the schema node addressed by a schema path.
 
@@ -171,6 +440,62 @@ class DataModel:
         res["config"] = True
         return json.dumps(res)
 
+    def _partition(self, obj: ObjectValue, sn: InternalNode,
+                   route: List[InstanceName], chunk_size: int,
+                   parts: List[DataPart]) -> None:
+        """Find parts of an object value for parallel validation."""
+        for m in obj:
+            cn = sn.get_data_child(*sn._iname2qname(m))
+            val = obj[m]
+            mroute = route + [m]
+            sub = []
+            if isinstance(cn, ContainerNode) and isinstance(val, ObjectValue):
+                self._partition(val, cn, mroute, chunk_size, sub)
+            elif (isinstance(cn, ListNode) and isinstance(val, ArrayValue)
+                  and len(val) >= chunk_size and not cn._external_deps):
+                for i in range(0, len(val), chunk_size):
+                    sub.append(
+                        (mroute, ArrayValue(val[i:i + chunk_size]), True))
+            if sub:
+                parts.extend(sub)
+            elif not route and cn is not None and not cn._external_deps:
+                parts.append((mroute, val, False))
+
+    @staticmethod
+    def _skeleton(parts: List[DataPart]) -> ObjectValue:
+        """Return root value that shares `parts` with the data tree."""
+        res = ObjectValue()
+        for route, val, entries in parts:
+            obj = res
+            for m in route[:-1]:
+                obj = obj.setdefault(m, ObjectValue())
+            if entries:
+                obj.setdefault(route[-1], ArrayValue()).extend(val)
+            else:
+                obj[route[-1]] = val
+        return res
+
+    def _validate_part(self, part: DataPart, scope: ValidationScope,
+                       ctype: ContentType) -> bool:
+        """Validate a part of a data tree.
+
+        Returns:
+            ``True`` if the part is valid.
+        """
+        skel = self._skeleton([part])
+        node = RootNode(skel, self.schema, skel.timestamp)
+        try:
+            for m in part[0]:
+                node = node._member(m)
+            if not part[2]:
+                node.validate(scope, ctype)
+                return True
+            for i in range(len(node.value)):
+                node.schema_node._validate(node._entry(i), scope, ctype)
+        except YangsonException:
+            return False
+        return True
+
     def _build_schema(self) -> None:
         for mid in self.schema_data._module_sequence:
             sctx = SchemaContext(
@@ -185,3 +510,20 @@ class DataModel:
                 self.schema._augment_stmt(aug, sctx)
         self.schema._post_process()
         self.schema._make_schema_patterns()
+        self.schema._make_dependencies()
+
+
+_worker_model = None  # type: Optional[DataModel]
+"""Data model loaded in a worker process."""
+
+
+def _init_worker(state: bytes) -> None:
+    """Load the pickled data model in a worker process."""
+    global _worker_model
+    _worker_model = pickle.loads(state)
+
+
+def _validate_part(part: DataPart, scope: ValidationScope,
+                   ctype: ContentType) -> bool:
+    """Validate a part of a data tree in a worker process."""
+    return _worker_model._validate_part(part, scope, ctype)
@@ -518,6 +518,9 @@ class LeafrefType(LinkType):
         return self.ref_type.to_raw(val)
 
     def _deref(self, node: InstanceNode) -> List[InstanceNode]:
+        index = self.path._string_index(node)
+        if index is not None:
+            return list(index.get(str(node), ()))
         ns = self.path.evaluate(node)
         return [n for n in ns if str(n) == str(node)]
 
@@ -20,24 +20,29 @@
 This module implements the following classes:
 
 * LinkedList: Persistent linked list of instance values.
+* ListSlice: Persistent linked list backed by a segment of an array.
 * InstanceNode: Abstract class for instance nodes.
 * RootNode: Root of the data tree.
 * ObjectMember: Instance node that is an object member.
 * ArrayEntry: Instance node that is an array entry.
 * InstanceRoute: Route into an instance value.
+* ValidationErrors: Validation errors collected in one pass.
 * ResourceIdParser: Parser for RESTCONF resource identifiers.
 * InstanceIdParser: Parser for instance identifiers.
 """
 
 from datetime import datetime
+import itertools
 import json
-from typing import Dict, List, Optional, Tuple, Union
+import time
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
 from urllib.parse import unquote
 from .enumerations import ContentType, ValidationScope
 from .exceptions import (BadSchemaNodeType, EndOfInput, InstanceException,
                          InstanceValueError, InvalidKeyValue,
                          NonexistentInstance, NonDataNode,
-                         NonexistentSchemaNode, UnexpectedInput)
+                         NonexistentSchemaNode, UnexpectedInput,
+                         ValidationError)
 from .instvalue import (ArrayValue, InstanceKey,
                         ObjectValue, Value, ScalarValue, StructuredValue)
 from .parser import Parser
@@ -46,6 +51,7 @@ from .typealiases import (InstanceName, JSONPointer, QualName, RawValue,
 
 __all__ = ["InstanceNode", "RootNode", "ObjectMember", "ArrayEntry",
            "InstanceIdParser", "ResourceIdParser", "InstanceRoute",
+           "ValidationErrors",
            "InstanceException", "InstanceValueError", "NonexistentInstance"]
 
 
@@ -78,12 +84,10 @@ class LinkedList:
     def __iter__(self):
         """Iterate over receiver's entries."""
         cdr = self
-        while True:
-            try:
-                n, cdr = cdr.pop()
-            except IndexError:
-                return
-            yield n
+        while cdr.__class__ is LinkedList:
+            yield cdr.head
+            cdr = cdr.tail
+        yield from cdr
 
     def cons(self, val: Value) -> "LinkedList":
         """Prepend a value to the receiver in the persistent way.
@@ -115,10 +119,68 @@ class EmptyList(LinkedList, metaclass=_Singleton):
     def __getitem__(self, key):
         raise IndexError
 
+    def __iter__(self):
+        return iter(())
+
     def pop(self) -> None:
         raise IndexError
 
 
+class ListSlice(LinkedList):
+    """Persistent linked list backed by a segment of an array value.
+
+    The array must not be modified while it is shared by the receiver,
+    which is always the case for cooked values inside instance nodes.
+    Creating and popping the receiver takes constant time.
+    """
+
+    def __init__(self, vals: ArrayValue, start: int, stop: int,
+                 reverse: bool = False):
+        """Initialize the class instance.
+
+        Args:
+            vals: Underlying array.
+            start: Index of the first entry of the segment.
+            stop: Index following the last entry of the segment.
+            reverse: Flag to be set if the segment is traversed
+                backwards (from `stop` to `start`).
+        """
+        self.vals = vals
+        self.start = start
+        self.stop = stop
+        self.reverse = reverse
+
+    def __bool__(self):
+        return self.start < self.stop
+
+    def __iter__(self):
+        seg = self.vals[self.start:self.stop]
+        return reversed(seg) if self.reverse else iter(seg)
+
+    def cons(self, val: Value) -> LinkedList:
+        """Override the superclass method.
+
+        If `val` is the array entry adjacent to the segment, the result
+        is again a slice of the same array.
+        """
+        if self.reverse:
+            if self.stop < len(self.vals) and self.vals[self.stop] is val:
+                return ListSlice(self.vals, self.start, self.stop + 1, True)
+        elif self.start > 0 and self.vals[self.start - 1] is val:
+            return ListSlice(self.vals, self.start - 1, self.stop)
+        return LinkedList(val, self)
+
+    def pop(self) -> Tuple[Value, LinkedList]:
+        """Override the superclass method."""
+        if self.start >= self.stop:
+            raise IndexError
+        if self.reverse:
+            return (self.vals[self.stop - 1], ListSlice(
+                self.vals, self.start, self.stop - 1, True))
+        return (self.vals[self.start], ListSlice(
+            self.vals, self.start + 1, self.stop))
+
+
 class InstanceNode:
     """YANG data node instance implemented as a zipper structure."""
 
@@ -237,6 +299,8 @@ class InstanceNode:
         except (KeyError, IndexError, TypeError):
             raise NonexistentInstance(
                 self.json_pointer(), "item '{}'".format(key)) from None
+        if isinstance(newval, ArrayValue):
+            newval._derive_index(self.value, key % len(self.value), -1)
         return self._copy(newval)
 
     def up(self) -> "InstanceNode":
@@ -306,19 +370,70 @@ class InstanceNode:
         return val
 
     def validate(self, scope: ValidationScope = ValidationScope.all,
-                 ctype: ContentType = ContentType.config) -> None:
+                 ctype: ContentType = ContentType.config,
+                 base: "InstanceNode" = None) -> None:
         """Validate the receiver's value.
 
         Args:
             scope: Scope of the validation (syntax, semantics or all).
             ctype: Receiver's content type.
+            base: Previous version of the receiver that passed validation
+                with the same `scope` and `ctype`. Subtrees that are
+                shared with it are then validated only partially.
 
         Raises:
             SchemaError: If the value doesn't conform to the schema.
             SemanticError: If the value violates a semantic constraint.
             YangTypeError: If the value is a scalar of incorrect type.
         """
-        self.schema_node._validate(self, scope, ctype)
+        self._validate(scope, ctype, base)
+
+    def validate_all(self, scope: ValidationScope = ValidationScope.all,
+                     ctype: ContentType = ContentType.config,
+                     base: "InstanceNode" = None, max_errors: int = None,
+                     time_budget: float = None) -> "ValidationErrors":
+        """Validate the receiver's value and collect all errors.
+
+        Args:
+            scope: Scope of the validation (syntax, semantics or all).
+            ctype: Receiver's content type.
+            base: Previous version of the receiver that passed validation
+                (see :meth:`validate`).
+            max_errors: Maximum number of errors to be collected.
+            time_budget: Maximum duration of the validation in seconds.
+
+        Returns:
+            List of errors (empty if validation succeeds).
+        """
+        errors = ValidationErrors(max_errors, time_budget)
+        try:
+            self._validate(scope, ctype, base, errors)
+        except _ValidationStopped:
+            errors.complete = False
+        return errors
+
+    def _validate(self, scope: ValidationScope, ctype: ContentType,
+                  base: Optional["InstanceNode"],
+                  errors: "ValidationErrors" = None) -> None:
+        """Validate the receiver, possibly relative to `base`.
+
+        Values of XPath subexpressions that depend only on data are
+        computed once during the validation pass.
+        """
+        with _eval_cache:
+            if base is None:
+                self.schema_node._validate(self, scope, ctype, errors=errors)
+                return
+            top = self.top()
+            changed = set()
+            top.schema_node._changed_nodes(top.value, base.top().value,
+                                           changed)
+            revisit = set()
+            for sn in changed:
+                revisit.update(sn._recheck)
+            if self.value is not base.value or self.schema_node in revisit:
+                self.schema_node._validate(self, scope, ctype, base.value,
+                                           revisit, errors)
 
     def add_defaults(self, ctype: ContentType = None) -> "InstanceNode":
         """Return the receiver with defaults added recursively to its value.
@@ -357,6 +472,39 @@ class InstanceNode:
             return [en.raw_value() for en in self]
         return self.schema_node.type.to_raw(self.value)
 
+    def json_chunks(self) -> Iterator[str]:
+        """Serialize receiver's value as JSON text.
+
+        The text is generated directly from the cooked value, without
+        creating instance nodes for its members and entries.
+
+        Returns:
+            Generator of text chunks.
+
+        Raises:
+            NonexistentSchemaNode: If a member of receiver's value isn't
+                defined in the schema.
+        """
+        return self.schema_node._json_chunks(self.value)
+
+    def write_json(self, fileobj: TextIO, chunk_size: int = 65536) -> None:
+        """Write receiver's value as JSON text to a file.
+
+        Args:
+            fileobj: File object opened in text mode.
+            chunk_size: Approximate size of text written at a time.
+        """
+        buf = []
+        size = 0
+        for chunk in self.json_chunks():
+            buf.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                fileobj.write("".join(buf))
+                buf = []
+                size = 0
+        fileobj.write("".join(buf))
+
     def _member(self, name: InstanceName) -> "ObjectMember":
         sibs = self.value.copy()
         try:
@@ -370,12 +518,12 @@ class InstanceNode:
     def _entry(self, index: int) -> "ArrayEntry":
         val = self.value
         try:
+            ent = val[index]
             i = len(val) + index if index < 0 else index
-            return ArrayEntry(i, LinkedList.from_list(val[:i], reverse=True),
-                              LinkedList.from_list(val[i + 1:]),
-                              val[index], self, self.schema_node,
-                              val.timestamp)
-        except (IndexError, TypeError):
+            return ArrayEntry(i, ListSlice(val, 0, i, True),
+                              ListSlice(val, i + 1, len(val)),
+                              ent, self, self.schema_node, val.timestamp)
+        except (IndexError, KeyError, TypeError):
             raise NonexistentInstance(self.json_pointer(), "entry " + str(index)) from None
 
     def _peek_schema_route(self, sroute: SchemaRoute) -> Value:
@@ -401,55 +549,87 @@ class InstanceNode:
         return list(self) if isinstance(self.value, ArrayValue) else [self]
 
     def _children(self, qname:
-                  Union[QualName, bool] = None) -> List["InstanceNode"]:
-        """XPath - return the list of receiver's children."""
+                  Union[QualName, bool] = None) -> Iterator["InstanceNode"]:
+        """XPath - iterate over receiver's children."""
         sn = self.schema_node
         if not isinstance(sn, InternalNode):
-            return []
+            return
         if qname:
             cn = sn.get_data_child(*qname)
             if cn is None:
-                return []
+                return
             iname = cn.iname()
             if iname in self.value:
-                return self._member(iname)._node_set()
-            wd = cn._default_instance(self, ContentType.all, lazy=True)
-            if iname not in wd.value:
-                return []
-            while True:
-                cn = cn.parent
-                if cn is sn:
-                    return wd._member(iname)._node_set()
-                if (cn.when and not cn.when.evaluate(self) or
-                    isinstance(cn, CaseNode) and
-                        cn.qual_name != cn.parent.default_case):
-                    return []
-        res = []
-        wd = sn._add_defaults(self, ContentType.all, lazy=True)
-        for mn in wd.value:
-            res.extend(wd._member(mn)._node_set())
-        return res
+                yield from self._member(iname)._node_set()
+            else:
+                yield from sn._default_members(self, cn)
+            return
+        for mn in self.value:
+            yield from self._member(mn)._node_set()
+        yield from sn._default_members(self)
+
+    def _keyed_children(
+            self, qname: QualName,
+            kvals: Dict[QualName, List[str]]) -> Optional[List["InstanceNode"]]:
+        """XPath - return entries of a child list selected by key values.
+
+        The key index of the list is used, see :meth:`.ArrayValue.key_index`.
+
+        Args:
+            qname: Qualified name of the list.
+            kvals: Dictionary mapping qualified names of all list keys
+                to lists of admissible values in canonical form.
+
+        Returns:
+            List of selected entries, or ``None`` if the key index
+            cannot be used.
+        """
+        sn = self.schema_node
+        cn = (sn.get_data_child(*qname) if isinstance(sn, InternalNode)
+              else None)
+        if not isinstance(cn, ListNode) or set(kvals) != set(cn.keys):
+            return None
+        iname = cn.iname()
+        if iname not in self.value:
+            return []
+        mem = self._member(iname)
+        if not isinstance(mem.value, ArrayValue):
+            return None
+        idx = mem.value.key_index(cn._key_members)
+        if idx is None:
+            return None
+        kcands = []
+        for k in cn.keys:
+            ktype = cn.get_data_child(*k).type
+            vals = []
+            for text in kvals[k]:
+                val = ktype.parse_value(text)
+                if val is None or ktype.canonical_string(val) != text:
+                    return None
+                vals.append(val)
+            kcands.append(vals)
+        sel = {idx[kv] for kv in itertools.product(*kcands) if kv in idx}
+        return [mem._entry(i) for i in sorted(sel)]
 
     def _descendants(self, qname: Union[QualName, bool] = None,
-                     with_self: bool = False) -> List["InstanceNode"]:
-        """XPath - return the list of receiver's descendants."""
-        res = ([] if not with_self or (qname and self.qual_name != qname)
-               else [self])
+                     with_self: bool = False) -> Iterator["InstanceNode"]:
+        """XPath - iterate over receiver's descendants in document order."""
+        if with_self and not (qname and self.qual_name != qname):
+            yield self
         for c in self._children():
             if not qname or c.qual_name == qname:
-                res.append(c)
-            res += c._descendants(qname)
-        return res
+                yield c
+            yield from c._descendants(qname)
 
     def _preceding_siblings(
-            self, qname: Union[QualName, bool] = None) -> List["InstanceNode"]:
-        """XPath - return the list of receiver's preceding-siblings."""
-        return []
+            self, qname: Union[QualName, bool] = None) -> Iterator["InstanceNode"]:
+        """XPath - iterate over receiver's preceding-siblings."""
+        return iter(())
 
     def _following_siblings(
-            self, qname: Union[QualName, bool] = None) -> List["InstanceNode"]:
-        """XPath - return the list of receiver's following-siblings."""
-        return []
+            self, qname: Union[QualName, bool] = None) -> Iterator["InstanceNode"]:
+        """XPath - iterate over receiver's following-siblings."""
+        return iter(())
 
     def _parent(self) -> List["InstanceNode"]:
         """XPath - return the receiver's parent as a singleton list."""
@@ -460,6 +640,24 @@ class InstanceNode:
         return ([] if self.is_internal() else
                 self.schema_node.type._deref(self))
 
+    def _root_value(self) -> Optional[Value]:
+        """Return the value of the root if the receiver's tree is unmodified.
+
+        Returns:
+            ``None`` if the value of the receiver or an ancestor differs
+            from that in its parent, i.e. the tree has been edited.
+        """
+        inst = self
+        while inst.parinst:
+            par = inst.parinst
+            try:
+                if par.value[inst.path[-1]] is not inst.value:
+                    return None
+            except (IndexError, KeyError, TypeError):
+                return None
+            inst = par
+        return inst.value
+
 
 class RootNode(InstanceNode):
     """This class represents the root of the instance tree."""
@@ -553,8 +751,19 @@ class ObjectMember(InstanceNode):
             InstanceValueError: If the receiver's value is not a YANG list.
             NonexistentInstance: If no entry with matching keys exists.
         """
-        if not isinstance(self.schema_node, ListNode):
+        sn = self.schema_node
+        if not isinstance(sn, ListNode):
             raise InstanceValueError(self.json_pointer(), "lookup on non-list")
+        if (isinstance(self.value, ArrayValue) and sn.keys and
+                keys.keys() == set(sn._key_members)):
+            idx = self.value.key_index(sn._key_members)
+            if idx is not None:
+                try:
+                    return self._entry(
+                        idx[tuple([keys[k] for k in sn._key_members])])
+                except KeyError:
+                    raise NonexistentInstance(
+                        self.json_pointer(), "entry lookup failed") from None
         try:
             for i in range(len(self.value)):
                 en = self.value[i]
@@ -573,7 +782,7 @@ class ObjectMember(InstanceNode):
 
     def _zip(self) -> ObjectValue:
         """Zip the receiver into an object and return it."""
-        res = ObjectValue(self.siblings.copy(), self.timestamp)
+        res = ObjectValue(self.siblings, self.timestamp)
         res[self.name] = self.value
         return res
 
@@ -704,10 +913,30 @@ class ArrayEntry(InstanceNode):
 
     def _zip(self) -> ArrayValue:
         """Zip the receiver into an array and return it."""
-        res = list(self.before)
+        bef = self.before
+        aft = self.after
+        if (isinstance(bef, ListSlice) and isinstance(aft, ListSlice) and
+                bef.vals is aft.vals and bef.start == 0 and
+                aft.stop == len(aft.vals)):
+            vals = bef.vals
+            pos = bef.stop
+            if pos + 1 == aft.start:
+                if (vals[pos] is self.value and
+                        vals.timestamp == self.timestamp):
+                    return vals
+                res = ArrayValue(vals, self.timestamp)
+                list.__setitem__(res, pos, self.value)
+                res._derive_index(vals, pos, 0)
+                return res
+            if pos == aft.start:
+                res = ArrayValue(vals, self.timestamp)
+                list.insert(res, pos, self.value)
+                res._derive_index(vals, pos, 1)
+                return res
+        res = list(bef)
         res.reverse()
         res.append(self.value)
-        res.extend(list(self.after))
+        res.extend(aft)
         return ArrayValue(res, self.timestamp)
 
     def _copy(self, newval: Value, newts: datetime = None) -> "ArrayEntry":
@@ -732,34 +961,78 @@ class ArrayEntry(InstanceNode):
         return self.up()._ancestors(qname)
 
     def _preceding_siblings(
-            self, qname: Union[QualName, bool] = None) -> List[InstanceNode]:
-        """XPath - return the list of receiver's preceding siblings."""
+            self, qname: Union[QualName, bool] = None) -> Iterator[InstanceNode]:
+        """XPath - iterate over receiver's preceding siblings."""
         if qname and self.qual_name != qname:
-            return []
-        res = []
+            return
         en = self
-        for _ in self.before:
+        while en.before:
             en = en.previous()
-            res.append(en)
-        return res
+            yield en
 
     def _following_siblings(
-            self, qname: Union[QualName, bool] = None) -> List[InstanceNode]:
-        """XPath - return the list of receiver's following siblings."""
+            self, qname: Union[QualName, bool] = None) -> Iterator[InstanceNode]:
+        """XPath - iterate over receiver's following siblings."""
         if qname and self.qual_name != qname:
-            return []
-        res = []
+            return
         en = self
-        for _ in self.after:
+        while en.after:
             en = en.next()
-            res.append(en)
-        return res
+            yield en
 
     def _parent(self) -> List["InstanceNode"]:
         """XPath - return the receiver's parent as a singleton list."""
         return [self.up().up()]
 
 
+class ValidationErrors(list):
+    """Validation errors collected in one pass.
+
+    The collection stops when the maximum number of errors is reached or
+    the time budget is exhausted. Attribute :attr:`complete` is then
+    ``False``.
+    """
+
+    def __init__(self, max_errors: int = None, time_budget: float = None):
+        """Initialize the class instance.
+
+        Args:
+            max_errors: Maximum number of errors (unlimited if ``None``).
+            time_budget: Time limit in seconds (unlimited if ``None``).
+        """
+        super().__init__()
+        self.max_errors = max_errors
+        self.deadline = (None if time_budget is None else
+                         time.monotonic() + time_budget)
+        self.complete = True
+        """Has the whole instance been validated?"""
+
+    def add(self, err: ValidationError) -> None:
+        """Add an error to the receiver.
+
+        Raises:
+            _ValidationStopped: If the maximum number of errors is reached.
+        """
+        self.append(err)
+        if self.max_errors is not None and len(self) >= self.max_errors:
+            raise _ValidationStopped()
+        self.check_time()
+
+    def check_time(self) -> None:
+        """Check that the time budget isn't exhausted.
+
+        Raises:
+            _ValidationStopped: If the deadline has passed.
+        """
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise _ValidationStopped()
+
+
+class _ValidationStopped(Exception):
+    """Collection of validation errors has to be stopped."""
+    pass
+
+
 class InstanceRoute(list):
     """This class represents a route into an instance value."""
 
@@ -975,6 +1248,12 @@ class EntryKeys:
             sn:  Current schema node.
         """
         keys = self.parse_keys(sn)
+        if (isinstance(val, ArrayValue) and isinstance(sn, ListNode) and
+                sn.keys and keys.keys() == set(sn._key_members)):
+            idx = val.key_index(sn._key_members)
+            if idx is not None:
+                i = idx.get(tuple([keys[k] for k in sn._key_members]))
+                return (None if i is None else val[i], sn)
         for en in val:
             flag = True
             try:
@@ -1122,3 +1401,4 @@ class InstanceIdParser(Parser):
 from .schemanode import (AnydataNode, CaseNode, ChoiceNode, DataNode,       # NOQA
                          InternalNode, LeafNode, LeafListNode, ListNode,
                          RpcActionNode, SequenceNode, TerminalNode)
+from .xpathast import _eval_cache                                          # NOQA
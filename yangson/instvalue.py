@@ -24,8 +24,9 @@ This module implements the following classes:
 * ObjectValue: Cooked object value of an instance node.
 """
 
+from collections.abc import Mapping, MutableMapping
 from datetime import datetime
-from typing import Dict, List, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from .typealiases import InstanceName, ScalarValue
 
 # Type aliases
@@ -72,26 +73,429 @@ class StructuredValue:
 
 
 class ArrayValue(StructuredValue, list):
-    """This class represents cooked array values."""
+    """This class represents cooked array values.
+
+    Arrays of list entries can maintain an index that maps tuples of
+    key values to entry positions. It is built lazily by
+    :meth:`key_index`, and derived in constant time for arrays that
+    differ from an indexed array in a single entry: the derived index
+    only records the change, and positions of other entries are fixed
+    up upon lookup. After more than about √N such changes in a row,
+    the index is built anew.
+    """
+
+    _MIN_CHAIN = 16
+    """Number of derived indices that are always allowed in a row."""
 
     def __init__(self, val: List[EntryValue] = [], ts: datetime = None):
         StructuredValue.__init__(self, ts)
         list.__init__(self, val)
+        self._key_index = None  # type: Tuple[Tuple[InstanceName], Optional[Dict]]
 
     def __hash__(self) -> int:
         """Return hash value for the receiver."""
         return tuple([x.__hash__() for x in self]).__hash__()
 
+    def __reduce__(self):
+        """Pickle the receiver's entries without the key index."""
+        return (self.__class__, (list(self), self.timestamp))
 
-class ObjectValue(StructuredValue, dict):
-    """This class represents cooked object values."""
+    def key_index(
+            self, kmembers: List[InstanceName]) -> Optional[Mapping]:
+        """Return the key index of the receiver.
 
-    def __init__(self, val: Dict[InstanceName, Value] = {},
-                 ts: datetime = None):
-        StructuredValue.__init__(self, ts)
-        dict.__init__(self, val)
+        The receiver must not be modified in place after this method
+        has been called.
+
+        Args:
+            kmembers: Instance names of list keys.
+
+        Returns:
+            Mapping of tuples of key values (in the order of `kmembers`)
+            to entry indices, or ``None`` if some keys are not unique.
+        """
+        keys = tuple(kmembers)
+        if self._key_index is None or self._key_index[0] != keys:
+            idx = {}
+            for i in range(len(self)):
+                kval = self._entry_key(i, keys)
+                if kval is not None and idx.setdefault(kval, i) != i:
+                    idx = None
+                    break
+            self._key_index = (keys, idx)
+        return self._key_index[1]
+
+    def _entry_key(self, index: int,
+                   keys: Tuple[InstanceName]) -> Optional[tuple]:
+        en = self[index]
+        try:
+            return tuple([en[k] for k in keys])
+        except (KeyError, TypeError):
+            return None
+
+    def _derive_index(self, orig: "ArrayValue", pos: int,
+                      shift: int) -> None:
+        """Derive the key index of the receiver from that of `orig`.
+
+        Args:
+            orig: Original array.
+            pos: Position of the entry that was replaced (`shift` is 0),
+                inserted (`shift` is 1) or deleted (`shift` is -1).
+        """
+        if orig._key_index is None or orig._key_index[1] is None:
+            return
+        keys, oidx = orig._key_index
+        okey = None if shift > 0 else orig._entry_key(pos, keys)
+        nkey = None if shift < 0 else self._entry_key(pos, keys)
+        if shift == 0 and okey == nkey:
+            self._key_index = orig._key_index
+            return
+        depth = oidx.depth + 1 if isinstance(oidx, _DerivedIndex) else 1
+        if depth > self._MIN_CHAIN and depth * depth > len(self):
+            return                        # rebuilt upon the next lookup
+        if nkey is not None and nkey != okey and nkey in oidx:
+            return                        # duplicate keys
+        self._key_index = (keys, _DerivedIndex(
+            oidx, pos, shift, okey, nkey, depth))
+
+
+class _DerivedIndex(Mapping):
+    """Key index of an array that differs from another one in one entry.
+
+    Only the change is recorded, positions found in the original index
+    are adjusted upon lookup.
+    """
+
+    __slots__ = ("orig", "pos", "shift", "okey", "nkey", "depth")
+
+    def __init__(self, orig: Mapping, pos: int, shift: int,
+                 okey: Optional[tuple], nkey: Optional[tuple], depth: int):
+        self.orig = orig
+        """Key index of the original array."""
+        self.pos = pos
+        """Position of the changed entry."""
+        self.shift = shift
+        """Kind of the change (0 replace, 1 insert, -1 delete)."""
+        self.okey = okey
+        """Key of the original entry (``None`` for insert)."""
+        self.nkey = nkey
+        """Key of the new entry (``None`` for delete)."""
+        self.depth = depth
+        """Number of derived indices in the chain."""
+
+    def __getitem__(self, key: tuple) -> int:
+        changes = []
+        idx = self
+        while isinstance(idx, _DerivedIndex):
+            if key == idx.nkey:
+                res = idx.pos
+                break
+            if key == idx.okey:
+                raise KeyError(key)
+            changes.append(idx)
+            idx = idx.orig
+        else:
+            res = idx[key]
+        for ch in reversed(changes):
+            if res > ch.pos or (res == ch.pos and ch.shift > 0):
+                res += ch.shift
+        return res
+
+    def __iter__(self) -> Iterator[tuple]:
+        seen = set()
+        idx = self
+        while isinstance(idx, _DerivedIndex):
+            if idx.nkey is not None:
+                seen.add(idx.nkey)
+            idx = idx.orig
+        seen.update(idx)
+        return iter([k for k in seen if k in self])
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+
+class ObjectValue(StructuredValue):
+    """This class represents cooked object values.
+
+    Every object value is an instance of one of two subclasses, which is
+    selected upon creation. An object with up to :attr:`_FLAT_MAX`
+    members is a plain dictionary (:class:`_FlatObjectValue`). A larger
+    object (:class:`_TrieObjectValue`) keeps its members in a persistent
+    hash array mapped trie: :meth:`copy` then shares the whole trie with
+    the original, and every subsequent modification copies only the
+    nodes on the path to the affected member, i.e. O(log N) of them.
+    Members are iterated in the order of their insertion in both cases.
+
+    A copy retains the representation of the original, except that a
+    trie-based object with no more than half of :attr:`_FLAT_MAX`
+    members is copied to a dictionary.
+    """
+
+    _FLAT_MAX = 32
+    """Maximum number of members of an object created as a dictionary."""
+
+    def __new__(cls, val: Dict[InstanceName, Value] = {},
+                ts: datetime = None) -> "ObjectValue":
+        if cls is ObjectValue:
+            if isinstance(val, ObjectValue):
+                cls = val.__class__
+            elif len(val) > cls._FLAT_MAX:
+                cls = _TrieObjectValue
+            else:
+                cls = _FlatObjectValue
+            return cls.__new__(cls, val, ts)
+        return super().__new__(cls)
+
+    def __eq__(self, val: "StructuredValue") -> bool:
+        """Return ``True`` if the receiver equal to `val`.
+
+        Args:
+            val: Value to compare.
+        """
+        return isinstance(val, ObjectValue) and hash(self) == hash(val)
+
+    def __ne__(self, val: "StructuredValue") -> bool:
+        return not self == val
 
     def __hash__(self) -> int:
         """Return hash value for the receiver."""
         sks = sorted(self.keys())
         return tuple([(k, self[k].__hash__()) for k in sks]).__hash__()
+
+    def __reduce__(self):
+        """Pickle the receiver's members as a dictionary.
+
+        Trie layout depends on string hashes that differ between
+        processes, so it has to be rebuilt upon unpickling.
+        """
+        return (ObjectValue, (dict(self.items()), self.timestamp))
+
+
+class _FlatObjectValue(ObjectValue, dict):
+    """Object value whose members are stored in the dictionary itself."""
+
+    __new__ = dict.__new__
+
+    def __init__(self, val: Dict[InstanceName, Value] = {},
+                 ts: datetime = None):
+        StructuredValue.__init__(self, ts)
+        dict.__init__(self, val)
+
+    def copy(self) -> "_FlatObjectValue":
+        """Return a shallow copy of the receiver."""
+        return _FlatObjectValue(self, datetime.now())
+
+    def __setitem__(self, key: InstanceName, value: Value) -> None:
+        dict.__setitem__(self, key, value)
+        self.timestamp = datetime.now()
+
+    def __delitem__(self, key: InstanceName) -> None:
+        dict.__delitem__(self, key)
+        self.timestamp = datetime.now()
+
+
+class _TrieObjectValue(ObjectValue, MutableMapping):
+    """Object value whose members are stored in a trie.
+
+    This class is deliberately not a subclass of :class:`dict`:
+    functions that read the storage of dictionaries directly (such as
+    :func:`json.dumps`) would see an empty object.
+    """
+
+    _BUCKET_MAX = 8
+    """Maximum number of members in a trie bucket."""
+
+    _MAX_DEPTH = 12
+    """Maximum depth of the trie (5 bits of hash value per level)."""
+
+    def __init__(self, val: Dict[InstanceName, Value] = {},
+                 ts: datetime = None):
+        StructuredValue.__init__(self, ts)
+        if isinstance(val, _TrieObjectValue):
+            self._root = val._root
+            self._len = val._len
+            self._seq = val._seq
+            self._order = val._order
+            return
+        bucket = {}
+        seq = 0
+        for k in val:
+            bucket[k] = (seq, val[k])
+            seq += 1
+        self._root = self._split(bucket, 0)
+        self._len = self._seq = seq
+        self._order = _MemberOrder(tuple(bucket))
+
+    def copy(self) -> ObjectValue:
+        """Return a shallow copy of the receiver.
+
+        Unless the receiver is converted to a dictionary, this takes
+        constant time.
+        """
+        if self._len <= self._FLAT_MAX // 2:
+            return _FlatObjectValue(self, datetime.now())
+        return _TrieObjectValue(self, datetime.now())
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key: InstanceName) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, key: InstanceName) -> Value:
+        node = self._root
+        h = hash(key)
+        while True:
+            node = node[h & 31]
+            if node.__class__ is list:
+                h >>= 5
+            elif node is None:
+                raise KeyError(key)
+            else:
+                return node[key][1]
+
+    def __iter__(self) -> Iterator[InstanceName]:
+        return iter(self._order.resolve(self))
+
+    def __setitem__(self, key: InstanceName, value: Value) -> None:
+        self._trie_set(key, value)
+        self.timestamp = datetime.now()
+
+    def __delitem__(self, key: InstanceName) -> None:
+        self._trie_delete(key)
+        self.timestamp = datetime.now()
+
+    @classmethod
+    def _split(cls, bucket: Dict[InstanceName, Tuple[int, Value]],
+               depth: int) -> List:
+        """Distribute a bucket to a new trie node at the given depth."""
+        node = [None] * 32
+        shift = 5 * depth
+        for k, sv in bucket.items():
+            i = hash(k) >> shift & 31
+            b = node[i]
+            if b is None:
+                b = node[i] = {}
+            b[k] = sv
+        if depth < cls._MAX_DEPTH:
+            for i in range(32):
+                b = node[i]
+                if b is not None and len(b) > cls._BUCKET_MAX:
+                    node[i] = cls._split(b, depth + 1)
+        return node
+
+    def _trie_set(self, key: InstanceName, value: Value) -> None:
+        h = hash(key)
+        node = root = list(self._root)
+        depth = 0
+        while True:
+            i = h & 31
+            child = node[i]
+            if child.__class__ is not list:
+                break
+            node[i] = node = list(child)
+            h >>= 5
+            depth += 1
+        bucket = {} if child is None else dict(child)
+        old = bucket.get(key)
+        if old is None:
+            bucket[key] = (self._seq, value)
+            self._seq += 1
+            self._len += 1
+            self._order = self._order.derive(key, True)
+        else:
+            bucket[key] = (old[0], value)
+        node[i] = (self._split(bucket, depth + 1)
+                   if len(bucket) > self._BUCKET_MAX and depth < self._MAX_DEPTH
+                   else bucket)
+        self._root = root
+
+    def _trie_delete(self, key: InstanceName) -> None:
+        h = hash(key)
+        node = root = list(self._root)
+        while True:
+            i = h & 31
+            child = node[i]
+            if child.__class__ is not list:
+                break
+            node[i] = node = list(child)
+            h >>= 5
+        if child is None or key not in child:
+            raise KeyError(key)
+        bucket = dict(child)
+        del bucket[key]
+        node[i] = bucket if bucket else None
+        self._root = root
+        self._len -= 1
+        self._order = self._order.derive(key, False)
+
+    def _trie_entries(self) -> Iterator[Tuple[int, InstanceName]]:
+        """Iterate over sequence numbers and names of trie members."""
+        todo = [self._root]
+        while todo:
+            for child in todo.pop():
+                if child.__class__ is list:
+                    todo.append(child)
+                elif child is not None:
+                    for k, sv in child.items():
+                        yield (sv[0], k)
+
+
+class _MemberOrder:
+    """Order of members of a trie-based object value.
+
+    An instance is shared by all copies of the same version of an object,
+    so the order is computed at most once for them. A new version only
+    records the member that was added or deleted, and its order is
+    derived from that of the previous version upon the first iteration.
+    """
+
+    __slots__ = ("keys", "base", "key", "added", "depth")
+
+    _MAX_CHAIN = 64
+    """Maximum number of recorded changes before sorting the members."""
+
+    def __init__(self, keys: Tuple[InstanceName] = None,
+                 base: "_MemberOrder" = None, key: InstanceName = None,
+                 added: bool = False, depth: int = 0):
+        self.keys = keys
+        self.base = base
+        self.key = key
+        self.added = added
+        self.depth = depth
+
+    def derive(self, key: InstanceName, added: bool) -> "_MemberOrder":
+        """Return the order after adding or deleting a member."""
+        if self.depth >= self._MAX_CHAIN:
+            return _MemberOrder()
+        return _MemberOrder(None, self, key, added, self.depth + 1)
+
+    def resolve(self, obj: _TrieObjectValue) -> Tuple[InstanceName]:
+        """Return member names of `obj` (of the receiver's version)."""
+        if self.keys is not None:
+            return self.keys
+        changes = []
+        node = self
+        while node.keys is None and node.base is not None:
+            changes.append(node)
+            node = node.base
+        if node.keys is None:
+            self.keys = tuple([k for s, k in sorted(obj._trie_entries())])
+        else:
+            res = dict.fromkeys(node.keys)
+            for ch in reversed(changes):
+                if ch.added:
+                    res[ch.key] = None
+                else:
+                    del res[ch.key]
+            self.keys = tuple(res)
+        self.base = None
+        return self.keys
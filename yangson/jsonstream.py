@@ -0,0 +1,244 @@
+# Copyright © 2016, 2017 CZ.NIC, z. s. p. o.
+#
+# This file is part of Yangson.
+#
+# Yangson is free software: you can redistribute it and/or modify it under the
+# terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# Yangson is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with Yangson.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Incremental parsing of JSON text.
+
+This module implements the following class:
+
+* JSONStreamParser: Incremental parser of JSON text read from a file.
+"""
+
+import re
+from json import JSONDecodeError
+from json.decoder import scanstring
+from json.scanner import NUMBER_RE
+from typing import Iterator, TextIO
+from .typealiases import RawScalar, RawValue
+
+__all__ = ["JSONStreamParser"]
+
+
+class JSONStreamParser:
+    """Incremental parser of JSON text read from a file.
+
+    The text is read in chunks, and only the part that hasn't been
+    parsed yet is kept in memory. Objects and arrays can be traversed
+    member by member and entry by entry, respectively, so that the
+    caller may construct its own representation of the data.
+    """
+
+    char_re = re.compile(r"[ \t\n\r]*([^ \t\n\r])")
+    """Regular expression for the next character other than whitespace."""
+
+    literals = (("true", True), ("false", False), ("null", None))
+    """JSON literals and their Python values."""
+
+    def __init__(self, fileobj: TextIO, chunk_size: int = 65536):
+        """Initialize the class instance.
+
+        Args:
+            fileobj: File object opened in text mode.
+            chunk_size: Number of characters to read at a time.
+        """
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        """Text read from the file and not discarded yet."""
+        self.offset = 0
+        """Current position in the buffer."""
+        self._eof = False
+        self._lines = 0
+        self._column = 0
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character.
+
+        The character is not consumed. Empty string is returned at the
+        end of input.
+        """
+        while True:
+            mo = self.char_re.match(self.buffer, self.offset)
+            if mo:
+                self.offset = mo.start(1)
+                return mo.group(1)
+            self.offset = len(self.buffer)
+            if not self._fill():
+                return ""
+
+    def value(self) -> RawValue:
+        """Parse a JSON value and return it in raw form."""
+        c = self.peek()
+        if c == "{":
+            res = {}
+            for name in self.members():
+                res[name] = self.value()
+            return res
+        if c == "[":
+            return [self.value() for _ in self.entries()]
+        if c == '"':
+            return self.string()
+        return self._atom()
+
+    def skip(self) -> None:
+        """Parse a JSON value and discard it.
+
+        Unlike :meth:`value`, no raw data is constructed, so this can be
+        used for checking the syntax of arbitrarily large input.
+        """
+        c = self.peek()
+        if c == "{":
+            for _ in self.members():
+                self.skip()
+        elif c == "[":
+            for _ in self.entries():
+                self.skip()
+        elif c == '"':
+            self.string()
+        else:
+            self._atom()
+
+    def members(self) -> Iterator[str]:
+        """Iterate over member names of a JSON object.
+
+        The value of each member has to be consumed (e.g. by calling
+        :meth:`value`) before the iteration is resumed.
+
+        Raises:
+            JSONDecodeError: If the input isn't a syntactically correct
+                JSON object.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self.offset += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error(
+                    "Expecting property name enclosed in double quotes")
+            name = self.string()
+            self._expect(":")
+            yield name
+            c = self.peek()
+            if c == "}":
+                self.offset += 1
+                return
+            self._expect(",")
+
+    def entries(self) -> Iterator[None]:
+        """Iterate over entries of a JSON array.
+
+        Each entry has to be consumed (e.g. by calling :meth:`value`)
+        before the iteration is resumed.
+
+        Raises:
+            JSONDecodeError: If the input isn't a syntactically correct
+                JSON array.
+        """
+        self._expect("[")
+        if self.peek() == "]":
+            self.offset += 1
+            return
+        while True:
+            yield
+            c = self.peek()
+            if c == "]":
+                self.offset += 1
+                return
+            self._expect(",")
+
+    def string(self) -> str:
+        """Parse a JSON string and return its value."""
+        self._expect('"')
+        while True:
+            try:
+                res, self.offset = scanstring(self.buffer, self.offset)
+                return res
+            except JSONDecodeError as e:
+                self.offset -= 1        # keep the opening quote
+                if not self._fill():
+                    raise self._error(e.msg) from None
+                self.offset += 1
+
+    def finish(self) -> None:
+        """Check that no input other than whitespace remains.
+
+        Raises:
+            JSONDecodeError: If there is extra data.
+        """
+        if self.peek():
+            raise self._error("Extra data")
+
+    def _atom(self) -> RawScalar:
+        """Parse a number or literal."""
+        while True:
+            buf = self.buffer
+            i = self.offset
+            mo = NUMBER_RE.match(buf, i)
+            if mo:
+                if len(buf) - mo.end() < 3 and self._fill():
+                    continue            # the number may be incomplete
+                self.offset = mo.end()
+                integer, frac, exp = mo.groups()
+                if frac or exp:
+                    return float(integer + (frac or "") + (exp or ""))
+                return int(integer)
+            for lit, val in self.literals:
+                if buf.startswith(lit, i):
+                    self.offset = i + len(lit)
+                    return val
+            if len(buf) - i < 5 and self._fill():
+                continue
+            raise self._error("Expecting value")
+
+    def _expect(self, c: str) -> None:
+        if self.peek() != c:
+            raise self._error("Expecting '{}' delimiter".format(c))
+        self.offset += 1
+
+    def _fill(self) -> bool:
+        """Discard parsed text and read the next chunk.
+
+        Returns:
+            ``False`` if the end of input has been reached.
+        """
+        if self._eof:
+            return False
+        chunk = self.fileobj.read(
+            max(self.chunk_size, len(self.buffer) - self.offset))
+        if not chunk:
+            self._eof = True
+            return False
+        done = self.buffer[:self.offset]
+        nl = done.rfind("\n")
+        if nl < 0:
+            self._column += len(done)
+        else:
+            self._lines += done.count("\n")
+            self._column = len(done) - nl - 1
+        self.buffer = self.buffer[self.offset:] + chunk
+        self.offset = 0
+        return True
+
+    def _error(self, msg: str) -> JSONDecodeError:
+        """Return an exception for a syntax error at the current position."""
+        err = JSONDecodeError(msg, self.buffer, self.offset)
+        if err.lineno == 1:
+            err.colno += self._column
+        err.lineno += self._lines
+        err.args = ("{}: line {} column {}".format(
+            msg, err.lineno, err.colno),)
+        return err
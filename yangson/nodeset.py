@@ -17,7 +17,7 @@
 
 """XPath node-set"""
 
-from typing import Callable, Union
+from typing import Callable, List, Set, Tuple, Union
 from numbers import Number
 from .instance import InstanceNode
 
@@ -41,17 +41,33 @@ def comparison(meth):
 
 
 class NodeSet(list):
+    """List of instance nodes in which each path appears only once.
+
+    The paths of nodes that are already present are kept in a set while
+    a node-set is being built, so that both :meth:`union` and
+    :meth:`bind` run in linear time.
+    """
 
     def union(self, ns: "NodeSet") -> "NodeSet":
-        paths = set([n.path for n in self])
-        return self.__class__(self + [n for n in ns if n.path not in paths])
+        res = self.__class__(self)
+        res._add_nodes(ns, set([n.path for n in self]))
+        return res
 
     def bind(self, trans: NodeExpr) -> "NodeSet":
         res = self.__class__([])
+        paths = set()
         for n in self:
-            res = res.union(trans(n))
+            res._add_nodes(trans(n), paths)
         return res
 
+    def _add_nodes(self, nodes: List[InstanceNode], paths: Set[Tuple]) -> None:
+        """Append nodes whose paths aren't in `paths`, and update `paths`."""
+        for n in nodes:
+            p = n.path
+            if p not in paths:
+                paths.add(p)
+                self.append(n)
+
     def __float__(self) -> float:
         return float(self[0].value)
 
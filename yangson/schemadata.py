@@ -26,12 +26,15 @@ This module implements the following classes:
 * FeatureExprParser: Parser for if-feature expressions.
 """
 
-from typing import Any, Dict, List, MutableSet, Tuple
+from concurrent.futures import Executor, Future
+import os
+from typing import Any, Dict, List, MutableSet, Optional, Tuple
 from .exceptions import (
     InvalidSchemaPath, BadYangLibraryData, CyclicImports, DefinitionNotFound,
     FeaturePrerequisiteError, InvalidFeatureExpression, ModuleNotFound,
     ModuleNotImplemented, ModuleNotImported, ModuleNotRegistered,
-    ModuleContentMismatch, MultipleImplementedRevisions, UnknownPrefix)
+    ModuleContentMismatch, MultipleImplementedRevisions, UnknownPrefix,
+    YangsonException)
 from .parser import Parser
 from .statement import ModuleParser, Statement
 from .typealiases import (ModuleId, PrefName, QualName, RevisionDate,
@@ -93,9 +96,12 @@ class SchemaData:
         Args:
             yang_lib: Dictionary with YANG library data.
             mod_path: List of directories to search for YANG modules.
+            executor: Optional executor (such as a process pool) in which
+                YANG modules are read and parsed.
     """
 
-    def __init__(self, yang_lib: Dict[str, Any], mod_path: List[str]) -> None:
+    def __init__(self, yang_lib: Dict[str, Any], mod_path: List[str],
+                 executor: Executor = None) -> None:
         """Initialize the schema structures."""
         self.identity_adjs = {}  # type: Dict[QualName, IdentityAdjacency]
         """Dictionary of identity bases."""
@@ -109,13 +115,24 @@ class SchemaData:
         """Dictionary of supported annotations."""
         self._module_sequence = []  # type: List[ModuleId]
         """List that defines the order of module processing."""
-        self._from_yang_library(yang_lib)
-
-    def _from_yang_library(self, yang_lib: Dict[str, Any]) -> None:
+        self._module_files = {}  # type: Dict[ModuleId, str]
+        """Dictionary of files from which (sub)modules were read."""
+        self._dir_index = {}  # type: Dict[str, MutableSet[str]]
+        """Names of YANG files in directories of the search path."""
+        self._from_yang_library(yang_lib, executor)
+
+    def _from_yang_library(self, yang_lib: Dict[str, Any],
+                           executor: Executor = None) -> None:
         """Set the schema structures from YANG library data.
 
+        If `executor` is given, all (sub)modules are first submitted to it
+        for parsing. Modules that cannot be parsed there are loaded once
+        more in the calling process, so that the same exception is raised
+        as without the executor.
+
         Args:
             yang_lib: Dictionary with YANG library data.
+            executor: Optional executor in which modules are parsed.
 
         Raises:
             BadYangLibraryData: If YANG library data is invalid.
@@ -126,6 +143,7 @@ class SchemaData:
             ModuleNotFound: If a YANG module wasn't found in any of the
                 directories specified in `mod_path`.
         """
+        futs = self._submit_modules(yang_lib, executor) if executor else {}
         try:
             for item in yang_lib["ietf-yang-library:modules-state"]["module"]:
                 name = item["name"]
@@ -137,7 +155,7 @@ class SchemaData:
                     if name in self.implement:
                         raise MultipleImplementedRevisions(name)
                     self.implement[name] = rev
-                mod = self._load_module(name, rev)
+                mod = self._load_module(name, rev, futs.get(mid))
                 mdata.statement = mod
                 if "feature" in item:
                     mdata.features.update(item["feature"])
@@ -150,34 +168,82 @@ class SchemaData:
                         sdata = ModuleData(mid)
                         self.modules[smid] = sdata
                         mdata.submodules.add(smid)
-                        submod = self._load_module(*smid)
+                        submod = self._load_module(
+                            *smid, fut=futs.get(smid))
                         sdata.statement = submod
                         bt = submod.find1("belongs-to", name, required=True)
                         locpref = bt.find1("prefix", required=True).argument
                         sdata.prefix_map[locpref] = mid
         except KeyError as e:
             raise BadYangLibraryData("missing " + str(e)) from None
+        finally:
+            for fut in futs.values():
+                fut.cancel()
+            self._dir_index.clear()
         self._process_imports()
         self._check_feature_dependences()
 
-    def _load_module(self, name: YangIdentifier,
-                     rev: RevisionDate) -> Statement:
-        """Read and parse a YANG module or submodule."""
+    def _submit_modules(self, yang_lib: Dict[str, Any],
+                        executor: Executor) -> Dict[ModuleId, Future]:
+        """Submit all (sub)modules listed in YANG library for parsing.
+
+        Malformed entries are skipped, they are reported later.
+        """
+        res = {}
+        try:
+            items = yang_lib["ietf-yang-library:modules-state"]["module"]
+        except (KeyError, TypeError):
+            return res
+        mids = []
+        for item in items:
+            try:
+                mids.append((item["name"], item["revision"]))
+                mids.extend([(s["name"], s["revision"])
+                             for s in item.get("submodule", [])])
+            except (KeyError, TypeError, AttributeError):
+                continue
+        for mid in mids:
+            if mid not in res:
+                res[mid] = executor.submit(
+                    _parse_module, self._module_candidates(*mid), *mid)
+        return res
+
+    def _load_module(self, name: YangIdentifier, rev: RevisionDate,
+                     fut: Future = None) -> Statement:
+        """Read and parse a YANG module or submodule.
+
+        Args:
+            name: Name of the (sub)module.
+            rev: Revision of the (sub)module.
+            fut: Optional future with the result of :func:`_parse_module`.
+        """
+        res = fut.result() if fut else None
+        if res is None:
+            res = _find_module(self._module_candidates(name, rev), name, rev)
+        self._module_files[(name, rev)] = res[1]
+        return res[0]
+
+    def _module_candidates(self, name: YangIdentifier,
+                           rev: RevisionDate) -> List[str]:
+        """Return names of files that may contain a (sub)module.
+
+        The files are listed in the order in which they are tried, i.e.
+        for each directory of the search path first ``name@rev.yang``
+        and then ``name.yang``. Every directory is scanned only once.
+        """
+        res = []
+        fnames = ([name + "@" + rev + ".yang"] if rev else []) + [
+            name + ".yang"]
         for d in self.module_search_path:
-            run = 0
-            while run < 2:
-                fn = "{}/{}".format(d, name)
-                if rev and run == 0:
-                    fn += "@" + rev
-                fn += ".yang"
+            if d not in self._dir_index:
                 try:
-                    with open(fn, encoding='utf-8') as infile:
-                        res = ModuleParser(infile.read(), name, rev).parse()
-                except (FileNotFoundError, PermissionError, ModuleContentMismatch):
-                    run += 1
-                    continue
-                return res
-        raise ModuleNotFound(name, rev)
+                    self._dir_index[d] = {
+                        f for f in os.listdir(d) if f.endswith(".yang")}
+                except OSError:
+                    self._dir_index[d] = set()
+            res.extend(["{}/{}".format(d, f) for f in fnames
+                        if f in self._dir_index[d]])
+        return res
 
     def _process_imports(self) -> None:
         impl = set(self.implement.items())
@@ -576,3 +642,52 @@ class FeatureExprParser(Parser):
             except KeyError:
                 raise UnknownPrefix(p, self.mid) from None
         return n in self.schema_data.modules[fid].features
+
+
+def _find_module(candidates: List[str], name: YangIdentifier,
+                 rev: RevisionDate) -> Tuple[Statement, str]:
+    """Read and parse the first matching YANG module or submodule.
+
+    Files whose names don't contain the revision are checked by parsing
+    only their header, see :meth:`.ModuleParser.header`.
+
+    Args:
+        candidates: Names of files to try.
+        name: Name of the (sub)module.
+        rev: Revision of the (sub)module.
+
+    Returns:
+        The (sub)module statement and the name of its file.
+
+    Raises:
+        ModuleNotFound: If none of the files contains the (sub)module.
+    """
+    for fn in candidates:
+        try:
+            with open(fn, encoding='utf-8') as infile:
+                text = infile.read()
+            if rev and not fn.endswith("@" + rev + ".yang"):
+                try:
+                    head = ModuleParser(text).header()
+                except YangsonException:
+                    pass                # reported by the full parse
+                else:
+                    if head != (name, rev):
+                        continue
+            return (ModuleParser(text, name, rev).parse(), fn)
+        except (FileNotFoundError, PermissionError, ModuleContentMismatch):
+            continue
+    raise ModuleNotFound(name, rev)
+
+
+def _parse_module(candidates: List[str], name: YangIdentifier,
+                  rev: RevisionDate) -> Optional[Tuple[Statement, str]]:
+    """Find and parse a (sub)module in a worker process.
+
+    Returns:
+        The result of :func:`_find_module`, or ``None`` if it fails.
+    """
+    try:
+        return _find_module(candidates, name, rev)
+    except (YangsonException, OSError, ValueError):
+        return None
@@ -42,19 +42,22 @@ This module implements the following classes:
 """
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set, Tuple
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 from .constraint import Must
-from .datatype import (DataType, LeafrefType, LinkType,
-                       RawScalar, IdentityrefType)
+from .datatype import (DataType, InstanceIdentifierType, LeafrefType,
+                       LinkType, RawScalar, IdentityrefType)
 from .enumerations import Axis, ContentType, DefaultDeny, ValidationScope
 from .exceptions import (
-    InvalidLeafrefPath, InvalidArgument, RawMemberError, RawTypeError,
-    SchemaError, SemanticError, YangsonException, YangTypeError)
+    InvalidLeafrefPath, InvalidArgument, NonexistentSchemaNode,
+    RawMemberError, RawTypeError, SchemaError, SemanticError,
+    ValidationError, YangsonException, YangTypeError)
 from .instvalue import (
     ArrayValue, EntryValue, ObjectValue, Value)
+from .jsonstream import JSONStreamParser
 from .schemadata import Annotation, IdentityAdjacency, SchemaContext
 from .schpattern import (ChoicePattern, ConditionalPattern, Empty, Member,
-                         NotAllowed, Pair, SchemaPattern)
+                         Pair, PatternAutomaton, SchemaPattern)
 from .statement import Statement
 from .typealiases import (DataPath, InstanceName, JSONPointer, QualName,
                           RawEntry, RawList, RawObject, RawValue, ScalarValue,
@@ -81,6 +84,14 @@ class SchemaNode:
         """Optional "when" expression that makes the receiver conditional."""
         self._ctype = None
         """Content type of the receiver."""
+        self._xpath_deps = set()  # type: Set[SchemaNode]
+        """Schema nodes read by the receiver's XPath constraints."""
+        self._xpath_dependents = set()  # type: Set[SchemaNode]
+        """Schema nodes whose XPath constraints read the receiver."""
+        self._recheck = set()  # type: Set[SchemaNode]
+        """Schema nodes to be revalidated if the receiver changes."""
+        self._external_deps = False  # type: bool
+        """Do constraints inside receiver's instances read data outside?"""
 
     @property
     def qual_name(self) -> QualName:
@@ -131,6 +142,24 @@ class SchemaNode:
         """Return a list of data paths to descendant state data roots."""
         return [r.data_path() for r in self._state_roots()]
 
+    def xpath_dependencies(self) -> Set["SchemaNode"]:
+        """Return schema nodes that the receiver's constraints depend on.
+
+        The constraints are the receiver's **must** and **when**
+        expressions and the path of a **leafref** type. The schema root
+        in the result means that any part of the data tree may be read.
+        """
+        return frozenset(self._xpath_deps)
+
+    def xpath_dependents(self) -> Set["SchemaNode"]:
+        """Return schema nodes whose constraints depend on the receiver.
+
+        These constraints may have to be rechecked if an instance of the
+        receiver changes. Note that such a change also changes all
+        ancestor instances.
+        """
+        return frozenset(self._xpath_dependents)
+
     def from_raw(self, rval: RawValue, jptr: JSONPointer = "") -> Value:
         """Return instance value transformed from a raw value using receiver.
 
@@ -145,6 +174,54 @@ class SchemaNode:
         """
         raise NotImplementedError
 
+    def _from_stream(self, parser: JSONStreamParser,
+                     jptr: JSONPointer) -> Value:
+        """Parse JSON text and transform it into a value using receiver.
+
+        This method is a counterpart of :meth:`from_raw` that reads the
+        value from `parser`.
+        """
+        return self.from_raw(parser.value(), jptr)
+
+    def _json_chunks(self, val: Value) -> Iterator[str]:
+        """Serialize a cooked value as JSON text using receiver.
+
+        This implementation doesn't consult the schema, which is
+        appropriate for the contents of anydata and anyxml nodes.
+
+        Args:
+            val: Cooked value corresponding to the receiver.
+
+        Returns:
+            Generator of text chunks.
+        """
+        if isinstance(val, ObjectValue):
+            sep = "{"
+            for m in val:
+                yield sep + json.dumps(m) + ":"
+                yield from self._json_chunks(val[m])
+                sep = ","
+            yield "}" if sep == "," else "{}"
+        elif isinstance(val, ArrayValue):
+            sep = "["
+            for en in val:
+                yield sep
+                yield from self._json_chunks(en)
+                sep = ","
+            yield "]" if sep == "," else "[]"
+        else:
+            yield json.dumps(val)
+
+    def _cooker(self) -> Callable[[RawValue], Value]:
+        """Return a function that transforms a raw value using receiver.
+
+        The returned function does the same as :meth:`from_raw` but may
+        be specialized for the receiver and its descendants. It raises
+        :exc:`RawDataError` with an empty path on invalid input, so the
+        caller is responsible for reporting the correct JSON pointer.
+        """
+        return self.from_raw
+
     def _get_description(self, stmt: Statement):
         dst = stmt.find1("description")
         if dst is not None:
@@ -163,13 +240,21 @@ class SchemaNode:
         return res
 
     def _validate(self, inst: "InstanceNode", scope: ValidationScope,
-                  ctype: ContentType) -> None:
+                  ctype: ContentType, base: Value = None,
+                  revisit: Set["SchemaNode"] = frozenset(),
+                  errors: "ValidationErrors" = None) -> None:
         """Validate instance against the receiver.
 
         Args:
             inst: Instance node to be validated.
             scope: Scope of the validation (syntax, semantics or all)
             ctype: Content type of the instance.
+            base: Value of the same instance that passed a previous
+                validation, or ``None``.
+            revisit: Schema nodes whose instances have to be validated
+                even if they are the same as in `base`.
+            errors: Collector of validation errors, or ``None`` if the
+                first error is to be raised.
 
         Returns:
             ``None`` if validation succeeds.
@@ -181,6 +266,14 @@ class SchemaNode:
         """
         pass
 
+    @staticmethod
+    def _report(err: ValidationError,
+                errors: Optional["ValidationErrors"]) -> None:
+        """Raise `err`, or add it to `errors` if they are being collected."""
+        if errors is None:
+            raise err
+        errors.add(err)
+
     def _iname2qname(self, iname: InstanceName) -> QualName:
         """Translate instance name to qualified name in the receiver's context.
         """
@@ -261,12 +354,129 @@ class SchemaNode:
     def _post_process(self) -> None:
         pass
 
+    def _make_dependencies(self) -> None:
+        """Analyze and compile XPath constraints of the receiver."""
+        for expr, cnode, start in self._constraint_exprs():
+            expr._function()
+            deps = set()
+            ups = set()
+            deps.update(expr._analyze(DependencyContext(cnode, cnode,
+                                                        deps, ups)))
+            self._xpath_deps.update(deps)
+            chain = start._recheck_chain(deps | ups) if start else []
+            for sn in chain:
+                sn._external_deps = True
+            for d in deps:
+                d._xpath_dependents.add(self)
+                d._recheck.update(chain)
+
+    def _constraint_exprs(self) -> List[Tuple["Expr", "SchemaNode",
+                                              Optional["SchemaNode"]]]:
+        """Return XPath constraints of the receiver.
+
+        Each entry contains the expression, schema node of the context
+        node, and the schema node at which the constraint is checked
+        during validation (or ``None`` if it is not checked).
+        """
+        res = [(m.expression, self, self) for m in self.must]
+        if self.when:
+            cnode = (self if isinstance(self, DataNode) else
+                     self.data_parent() or self.schema_root())
+            res.append((self.when, cnode, self.parent))
+        return res
+
+    def _recheck_chain(self, reads: Set["SchemaNode"]) -> List["SchemaNode"]:
+        """Return the receiver and those ancestors that don't contain `reads`.
+
+        Instances of these nodes have to be checked again if an
+        instance of a node from `reads` changes. The result is empty
+        for nodes inside RPCs, actions and notifications.
+        """
+        chain = []
+        sn = self
+        while sn is not None:
+            if isinstance(sn, (RpcActionNode, NotificationNode)):
+                return []
+            chain.append(sn)
+            sn = sn.parent
+        pos = {sn: i for i, sn in enumerate(chain)}
+        top = 0
+        for sn in reads:
+            while sn is not None and sn not in pos:
+                sn = sn.parent
+            top = max(top, pos.get(sn, len(chain)))
+        return chain[:top]
+
+    def _axis_nodes(self, axis: Axis, qname: Optional[QualName],
+                    ups: Set["SchemaNode"]) -> Set["SchemaNode"]:
+        """XPath - return schema nodes of instances on an axis.
+
+        Args:
+            axis: XPath axis.
+            qname: Name of the instances, or ``None`` for any name.
+            ups: Set to which nodes reached by moving up are added.
+        """
+        def up(sn: SchemaNode) -> Optional[SchemaNode]:
+            return (None if sn.parent is None else
+                    sn.data_parent() or sn.schema_root())
+        if axis == Axis.self:
+            cands = [self]
+        elif axis in (Axis.child, Axis.descendant, Axis.descendant_or_self):
+            cands = [self] if axis == Axis.descendant_or_self else []
+            todo = [self]
+            while todo:
+                sn = todo.pop()
+                if isinstance(sn, InternalNode):
+                    cands.extend(sn.data_children())
+                    if axis != Axis.child:
+                        todo.extend(sn.data_children())
+        elif axis in (Axis.parent, Axis.ancestor, Axis.ancestor_or_self):
+            cands = [self] if axis == Axis.ancestor_or_self else []
+            sn = up(self)
+            while sn is not None:
+                cands.append(sn)
+                sn = None if axis == Axis.parent else up(sn)
+        else:                           # siblings
+            parent = up(self)
+            if parent is None:
+                return set()
+            ups.add(parent)
+            cands = parent.data_children()
+        res = {sn for sn in cands if qname is None or sn.qual_name == qname}
+        if axis in (Axis.parent, Axis.ancestor, Axis.ancestor_or_self):
+            ups.update(res)
+        return res
+
+    def _deref_nodes(self, dctx: "DependencyContext") -> Set["SchemaNode"]:
+        """XPath - return schema nodes of instances referred to by receiver."""
+        return set()
+
+    def _changed_nodes(self, val: Optional[Value], bval: Optional[Value],
+                       res: Set["SchemaNode"]) -> None:
+        """Collect schema nodes of instances that differ in two values.
+
+        Args:
+            val: Value of a receiver's instance, or ``None``.
+            bval: Previous version of `val`, or ``None``.
+            res: Set to which the schema nodes are added.
+        """
+        if val is not bval:
+            res.add(self)
+
     def _is_identityref(self) -> bool:
         return False
 
     def _default_nodes(self, inst: "InstanceNode") -> List["InstanceNode"]:
         return []
 
+    def _overlay_default(self) -> Optional[Value]:
+        """Return the default value of the receiver in the lazy mode.
+
+        It is the value that :meth:`_default_instance` uses if `lazy`
+        is true.
+        """
+        return None
+
     def _tree_line(self, no_type: bool = False) -> str:
         """Return the receiver's contribution to tree diagram."""
         return self._tree_line_prefix() + " " + self.iname()
@@ -325,6 +535,9 @@ class InternalNode(SchemaNode):
         super().__init__()
         self.children = []  # type: List[SchemaNode]
         self._mandatory_children = set()  # type: MutableSet[SchemaNode]
+        self._child_map = None  # type: Dict[QualName, SchemaNode]
+        self._data_child_map = None  # type: Dict[QualName, DataNode]
+        self._default_overlay = None  # type: Dict[DataNode, List[SchemaNode]]
 
     @property
     def mandatory(self) -> bool:
@@ -340,6 +553,8 @@ class InternalNode(SchemaNode):
             ns: Child's namespace (= `self.ns` if absent).
         """
         ns = ns if ns else self.ns
+        if ns and self._child_map is not None:
+            return self._child_map.get((name, ns))
         todo = []
         for child in self.children:
             if child.name is None:
@@ -368,6 +583,8 @@ class InternalNode(SchemaNode):
                        ns: YangIdentifier = None) -> Optional["DataNode"]:
         """Return data node directly under the receiver."""
         ns = ns if ns else self.ns
+        if ns and self._data_child_map is not None:
+            return self._data_child_map.get((name, ns))
         todo = []
         for child in self.children:
             if child.name == name and child.ns == ns:
@@ -407,7 +624,7 @@ class InternalNode(SchemaNode):
         """Override the superclass method."""
         if not isinstance(rval, dict):
             raise RawTypeError(jptr, "object")
-        res = ObjectValue()
+        res = {}
         for qn in rval:
             cn = self._iname2qname(qn)
             ch = self.get_data_child(*cn)
@@ -415,7 +632,58 @@ class InternalNode(SchemaNode):
             if ch is None:
                 raise RawMemberError(npath)
             res[ch.iname()] = ch.from_raw(rval[qn], npath)
-        return res
+        return ObjectValue(res)
+
+    def _from_stream(self, parser: JSONStreamParser,
+                     jptr: JSONPointer) -> ObjectValue:
+        """Override the superclass method."""
+        if parser.peek() != "{":
+            raise RawTypeError(jptr, "object")
+        res = {}
+        for qn in parser.members():
+            cn = self._iname2qname(qn)
+            ch = self.get_data_child(*cn)
+            npath = jptr + "/" + qn
+            if ch is None:
+                raise RawMemberError(npath)
+            res[ch.iname()] = ch._from_stream(parser, npath)
+        return ObjectValue(res)
+
+    def _json_chunks(self, val: ObjectValue) -> Iterator[str]:
+        """Override the superclass method."""
+        sep = "{"
+        for m in val:
+            qn = self._iname2qname(m)
+            ch = self.get_data_child(*qn)
+            if ch is None:
+                raise NonexistentSchemaNode(self.qual_name, *qn)
+            yield sep + json.dumps(m) + ":"
+            yield from ch._json_chunks(val[m])
+            sep = ","
+        yield "}" if sep == "," else "{}"
+
+    def _cooker(self) -> Callable[[RawObject], ObjectValue]:
+        """Override the superclass method."""
+        table = {}
+        for qn in self._data_child_map:
+            ch = self._data_child_map[qn]
+            entry = (ch.iname(), ch._cooker())
+            table[qn[1] + ":" + qn[0]] = entry
+            if qn[1] == self.ns:
+                table[qn[0]] = entry
+
+        def cook(rval: RawObject) -> ObjectValue:
+            if not isinstance(rval, dict):
+                raise RawTypeError("", "object")
+            res = {}
+            try:
+                for qn in rval:
+                    iname, ccook = table[qn]
+                    res[iname] = ccook(rval[qn])
+            except KeyError:
+                raise RawMemberError("") from None
+            return ObjectValue(res)
+        return cook
 
     def _node_digest(self) -> Dict[str, Any]:
         res = super()._node_digest()
@@ -429,12 +697,32 @@ class InternalNode(SchemaNode):
         return res
 
     def _validate(self, inst: "InstanceNode", scope: ValidationScope,
-                  ctype: ContentType) -> None:
+                  ctype: ContentType, base: Value = None,
+                  revisit: Set["SchemaNode"] = frozenset(),
+                  errors: "ValidationErrors" = None) -> None:
         """Extend the superclass method."""
-        if scope.value & ValidationScope.syntax.value:   # schema
-            self._check_schema_pattern(inst, ctype)
+        rejected = (self._check_schema_pattern(inst, ctype, errors)
+                    if scope.value & ValidationScope.syntax.value   # schema
+                    else frozenset())
+        bobj = base if isinstance(base, ObjectValue) else {}
         for m in inst.value:              # all members
-            inst._member(m).validate(scope, ctype)
+            if m in rejected:
+                continue                  # already reported
+            if errors is None:
+                csn = inst._member_schema_node(m)
+            else:
+                errors.check_time()
+                csn = self.get_data_child(*self._iname2qname(m))
+                if csn is None:
+                    continue              # not in validation scope
+            bval = bobj.get(m)
+            if bval is inst.value[m] and csn not in revisit:
+                continue                  # unchanged subtree
+            if isinstance(csn, LeafNode) and not csn._needs_instance:
+                csn._validate_member(inst, m, scope, bval, errors)
+                continue
+            mem = inst._member(m)
+            csn._validate(mem, scope, ctype, bval, revisit, errors)
 
     def _add_child(self, node: SchemaNode) -> None:
         node.parent = self
@@ -444,27 +732,46 @@ class InternalNode(SchemaNode):
         """Return the set of instance names under the receiver."""
         return frozenset([c.iname() for c in self.data_children()])
 
-    def _check_schema_pattern(self, inst: "InstanceNode",
-                              ctype: ContentType) -> None:
+    def _check_schema_pattern(
+            self, inst: "InstanceNode", ctype: ContentType,
+            errors: "ValidationErrors" = None) -> Set[InstanceName]:
+        """Check the members of `inst` against the receiver's schema pattern.
+
+        Returns:
+            Set of members that are not allowed (only if `errors` are
+            being collected, otherwise the first one is raised).
+        """
+        res = set()
         p = self.schema_pattern
         p._eval_when(inst)
+        key = (ctype, tuple([c._val_when for c in self._pattern_conditions]))
+        aut = self._pattern_automata.get(key)
+        if aut is None or aut.full():
+            aut = self._pattern_automata[key] = PatternAutomaton(p, ctype)
+        state = 0
         for m in inst.value:
-            newp = p.deriv(m, ctype)
-            if isinstance(newp, NotAllowed):
-                raise SchemaError(
+            newst = aut.step(state, m)
+            if newst is None:
+                self._report(SchemaError(
                     inst.json_pointer(),
                     ("" if ctype == ContentType.all else ctype.name + " ") +
-                    "member-not-allowed", m)
-            p = newp
-        if not p.nullable(ctype):
-            mms = p._mandatory_members(ctype)
+                    "member-not-allowed", m), errors)
+                res.add(m)
+                continue                  # skip the member
+            state = newst
+        if not aut.nullable(state):
+            mms = aut.states[state]._mandatory_members(ctype)
             msg = "one of " if len(mms) > 1 else ""
-            raise SchemaError(inst.json_pointer(), "missing-data",
-                              "expected " + msg + ", ".join([repr(m) for m in mms]))
+            self._report(SchemaError(
+                inst.json_pointer(), "missing-data",
+                "expected " + msg + ", ".join([repr(m) for m in mms])), errors)
+        return res
 
     def _make_schema_patterns(self) -> None:
         """Build schema pattern for the receiver and its data descendants."""
         self.schema_pattern = self._schema_pattern()
+        self._pattern_conditions = self.schema_pattern._conditions()
+        self._pattern_automata = {}
         for dc in self.data_children():
             if isinstance(dc, InternalNode):
                 dc._make_schema_patterns()
@@ -483,6 +790,114 @@ class InternalNode(SchemaNode):
         super()._post_process()
         for c in self.children:
             c._post_process()
+        self._make_child_maps()
+        self._make_default_overlay()
+
+    def _make_dependencies(self) -> None:
+        """Extend the superclass method."""
+        super()._make_dependencies()
+        for c in self.children:
+            c._make_dependencies()
+
+    def _changed_nodes(self, val: Optional[Value], bval: Optional[Value],
+                       res: Set[SchemaNode]) -> None:
+        """Extend the superclass method."""
+        if val is bval:
+            return
+        res.add(self)
+        obj = val if isinstance(val, ObjectValue) else {}
+        bobj = bval if isinstance(bval, ObjectValue) else {}
+        for m in set(obj).union(bobj):
+            cn = self.get_data_child(*self._iname2qname(m))
+            if cn is not None:
+                cn._changed_nodes(obj.get(m), bobj.get(m), res)
+
+    def _make_child_maps(self) -> None:
+        """Build dictionaries used by :meth:`get_child` and
+        :meth:`get_data_child`.
+
+        Children of anonymous groups and data nodes under non-data
+        children are included, so that both lookups are a single
+        dictionary access. Maps of the children must already exist.
+
+        The maps are not used if the namespace is unknown (i.e. on the
+        schema root without an explicit namespace), because then
+        namespaces of children apply in the traversal.
+        """
+        cmap = {}
+        dmap = {}
+        for c in self.children:
+            if c.name is not None:
+                cmap.setdefault((c.name, c.ns), c)
+                if isinstance(c, DataNode):
+                    dmap.setdefault((c.name, c.ns), c)
+        for c in self.children:
+            if c.name is None:
+                for qn in c._child_map:
+                    cmap.setdefault(qn, c._child_map[qn])
+            if not isinstance(c, DataNode):
+                for qn in c._data_child_map:
+                    dmap.setdefault(qn, c._data_child_map[qn])
+        self._child_map = cmap
+        self._data_child_map = dmap
+
+    def _make_default_overlay(self) -> None:
+        """Build the dictionary used by :meth:`_default_members`.
+
+        It maps data nodes that may get a default value in an instance
+        of the receiver to the list of non-data nodes (groups, choices
+        and cases) on the way to them. Overlays of the children must
+        already exist.
+        """
+        res = {}
+        for c in self.children:
+            if isinstance(c, DataNode):
+                if c._overlay_default() is not None:
+                    res[c] = []
+            elif not isinstance(c, (RpcActionNode, NotificationNode)):
+                for dn, conds in c._default_overlay.items():
+                    res[dn] = [c] + conds
+        self._default_overlay = res
+
+    def _overlay_active(self, inst: "InstanceNode") -> bool:
+        """Return ``True`` if defaults under the receiver apply in `inst`."""
+        return self.when is None or self.when.evaluate(inst)
+
+    def _default_members(self, inst: "InstanceNode",
+                         node: "DataNode" = None) -> Iterator["InstanceNode"]:
+        """Generate default instances of missing data children.
+
+        This gives the same nodes as those that :meth:`_add_defaults`
+        adds in the lazy mode, but the value of `inst` is not modified.
+        Every default instance is a member of `inst` with
+        the other members of `inst` as siblings.
+
+        Args:
+            inst: Instance of the receiver.
+            node: Data child that is considered (all if ``None``).
+        """
+        val = inst.value
+        if node is None:
+            todo = self._default_overlay.items()
+        elif node in self._default_overlay:
+            todo = [(node, self._default_overlay[node])]
+        else:
+            return
+        active = {}
+        for dn, conds in todo:
+            iname = dn.iname()
+            if iname in val:
+                continue
+            for c in conds:
+                if c not in active:
+                    active[c] = c._overlay_active(inst)
+                if not active[c]:
+                    break
+            else:
+                mem = ObjectMember(iname, val, dn._overlay_default(), inst,
+                                   dn, val.timestamp)
+                if dn.when is None or dn.when.evaluate(mem):
+                    yield from mem._node_set()
 
     def _add_mandatory_child(self, node: SchemaNode) -> None:
         """Add `node` to the set of mandatory children."""
@@ -542,9 +957,11 @@ class InternalNode(SchemaNode):
         if not sctx.schema_data.if_features(stmt, sctx.text_mid):
             return
         grp, gid = sctx.schema_data.get_definition(stmt, sctx)
-        if stmt.find1("when"):
+        wst = stmt.find1("when")
+        if wst:
             sn = GroupNode()
             self._add_child(sn)
+            sn._when_stmt(wst, sctx)
         else:
             sn = self
         sn._handle_substatements(grp, gid)
@@ -649,6 +1066,12 @@ class GroupNode(InternalNode):
             self._add_child(cn)
             cn._handle_child(node, stmt, sctx)
 
+    def _add_defaults(self, inst: "InstanceNode", ctype: ContentType,
+                      lazy: bool = False) -> "InstanceNode":
+        if self.when and not self.when.evaluate(inst):
+            return inst
+        return super()._add_defaults(inst, ctype, lazy)
+
     def _pattern_entry(self) -> SchemaPattern:
         return super()._schema_pattern()
 
@@ -721,11 +1144,13 @@ class DataNode(SchemaNode):
                 return None
 
     def _validate(self, inst: "InstanceNode", scope: ValidationScope,
-                  ctype: ContentType) -> None:
+                  ctype: ContentType, base: Value = None,
+                  revisit: Set["SchemaNode"] = frozenset(),
+                  errors: "ValidationErrors" = None) -> None:
         """Extend the superclass method."""
         if scope.value & ValidationScope.semantics.value:
-            self._check_must(inst)        # must expressions
-        super()._validate(inst, scope, ctype)
+            self._check_must(inst, errors)        # must expressions
+        super()._validate(inst, scope, ctype, base, revisit, errors)
 
     def _default_instance(self, pnode: "InstanceNode", ctype: ContentType,
                           lazy: bool = False) -> "InstanceNode":
@@ -739,11 +1164,12 @@ class DataNode(SchemaNode):
                 return wd.up()
         return pnode
 
-    def _check_must(self, inst: "InstanceNode") -> None:
+    def _check_must(self, inst: "InstanceNode",
+                    errors: "ValidationErrors" = None) -> None:
         for m in self.must:
             if not m.expression.evaluate(inst):
-                raise SemanticError(inst.json_pointer(), m.error_tag,
-                                    m.error_message)
+                self._report(SemanticError(inst.json_pointer(), m.error_tag,
+                                           m.error_message), errors)
 
     def _pattern_entry(self) -> SchemaPattern:
         m = Member(self.iname(), self.content_type(), self.when)
@@ -777,6 +1203,33 @@ class TerminalNode(SchemaNode):
             raise RawTypeError(jptr, self.type.yang_type() + " value")
         return res
 
+    def _from_stream(self, parser: JSONStreamParser,
+                     jptr: JSONPointer) -> ScalarValue:
+        """Override the superclass method."""
+        return TerminalNode.from_raw(self, parser.value(), jptr)
+
+    def _json_chunks(self, val: ScalarValue) -> Iterator[str]:
+        """Override the superclass method."""
+        yield json.dumps(self.type.to_raw(val))
+
+    def _cooker(self) -> Callable[[RawScalar], ScalarValue]:
+        """Override the superclass method."""
+        expected = self.type.yang_type() + " value"
+        if type(self.type).from_raw is DataType.from_raw:
+            def cook(rval: RawScalar) -> ScalarValue:
+                if isinstance(rval, str):
+                    return rval
+                raise RawTypeError("", expected)
+            return cook
+        conv = self.type.from_raw
+
+        def cook(rval: RawScalar) -> ScalarValue:
+            res = conv(rval)
+            if res is None:
+                raise RawTypeError("", expected)
+            return res
+        return cook
+
     def _node_digest(self) -> Dict[str, Any]:
         res = super()._node_digest()
         res["type"] = self.type._type_digest(self.config)
@@ -786,12 +1239,15 @@ class TerminalNode(SchemaNode):
         return res
 
     def _validate(self, inst: "InstanceNode", scope: ValidationScope,
-                  ctype: ContentType) -> None:
+                  ctype: ContentType, base: Value = None,
+                  revisit: Set["SchemaNode"] = frozenset(),
+                  errors: "ValidationErrors" = None) -> None:
         """Extend the superclass method."""
         if (scope.value & ValidationScope.syntax.value and
-                inst.value not in self.type):
-            raise YangTypeError(inst.json_pointer(), self.type.error_tag,
-                                self.type.error_message)
+                inst.value is not base and inst.value not in self.type):
+            self._report(YangTypeError(inst.json_pointer(), self.type.error_tag,
+                                       self.type.error_message), errors)
+            return
         if (isinstance(self.type, LinkType) and        # referential integrity
                 scope.value & ValidationScope.semantics.value and
                 self.type.require_instance):
@@ -800,13 +1256,17 @@ class TerminalNode(SchemaNode):
             except YangsonException:
                 tgt = []
             if not tgt:
-                raise SemanticError(inst.json_pointer(), "instance-required")
+                self._report(SemanticError(
+                    inst.json_pointer(), "instance-required"), errors)
 
     def _default_value(self, inst: "InstanceNode", ctype: ContentType,
                        lazy: bool) -> "InstanceNode":
         inst.value = self.default
         return inst
 
+    def _overlay_default(self) -> Optional[Value]:
+        return self.default
+
     def _post_process(self) -> None:
         super()._post_process()
         if isinstance(self.type, LeafrefType):
@@ -818,6 +1278,26 @@ class TerminalNode(SchemaNode):
     def _is_identityref(self) -> bool:
         return isinstance(self.type, IdentityrefType)
 
+    def _constraint_exprs(self) -> List[Tuple["Expr", SchemaNode,
+                                              Optional[SchemaNode]]]:
+        """Extend the superclass method."""
+        res = super()._constraint_exprs()
+        if isinstance(self.type, LinkType):
+            expr = (self.type.path if isinstance(self.type, LeafrefType)
+                    else Root())
+            res.append(
+                (expr, self, self if self.type.require_instance else None))
+        return res
+
+    def _deref_nodes(self, dctx: "DependencyContext") -> Set[SchemaNode]:
+        """Override the superclass method."""
+        if isinstance(self.type, LeafrefType):
+            return self.type.path._analyze(
+                DependencyContext(self, self, dctx.deps, dctx.ups))
+        if isinstance(self.type, InstanceIdentifierType):
+            return Root()._analyze(dctx)
+        return set()
+
     def _default_nodes(self, inst: "InstanceNode") -> List["InstanceNode"]:
         di = self._default_instance(inst, ContentType.all)
         return [] if di is None else [self]
@@ -863,6 +1343,9 @@ class ContainerNode(DataNode, InternalNode):
         inst.value = ObjectValue()
         return inst if lazy else self._add_defaults(inst, ctype)
 
+    def _overlay_default(self) -> Optional[Value]:
+        return None if self.presence else ObjectValue()
+
     def _default_nodes(self, inst: "InstanceNode") -> List["InstanceNode"]:
         if self.presence:
             return []
@@ -895,23 +1378,87 @@ class SequenceNode(DataNode):
         return self.min_elements > 0
 
     def _validate(self, inst: "InstanceNode", scope: ValidationScope,
-                  ctype: ContentType) -> None:
+                  ctype: ContentType, base: Value = None,
+                  revisit: Set["SchemaNode"] = frozenset(),
+                  errors: "ValidationErrors" = None) -> None:
         """Extend the superclass method."""
         if isinstance(inst, ArrayEntry):
-            super()._validate(inst, scope, ctype)
-        else:
-            if scope.value & ValidationScope.semantics.value:
-                self._check_list_props(inst)
-                self._check_cardinality(inst)
+            super()._validate(inst, scope, ctype, base, revisit, errors)
+            return
+        if scope.value & ValidationScope.semantics.value:
+            self._check_list_props(inst, errors)
+            self._check_cardinality(inst, errors)
+        if not isinstance(base, ArrayValue):
             for e in inst:
-                super()._validate(e, scope, ctype)
+                if errors is not None:
+                    errors.check_time()
+                super()._validate(e, scope, ctype, errors=errors)
+            return
+        bents = self._base_entries(inst.value, base)
+        for i in range(len(inst.value)):
+            bval = bents[i]
+            if bval is inst.value[i] and self not in revisit:
+                continue                  # unchanged entry
+            if errors is not None:
+                errors.check_time()
+            super()._validate(inst._entry(i), scope, ctype, bval, revisit,
+                              errors)
 
-    def _check_cardinality(self, inst: "InstanceNode") -> None:
+    def _base_entries(self, val: ArrayValue,
+                      base: ArrayValue) -> List[Optional[EntryValue]]:
+        """Pair entries of an array with those of its previous version.
+
+        Entries are paired by identity or, in list nodes, by their keys.
+
+        Returns:
+            List of base entries (or ``None``) corresponding to entries
+            of `val`.
+        """
+        bids = {id(en) for en in base}
+        keys = tuple(self._key_members) if isinstance(self, ListNode) else ()
+        kidx = None
+        res = []
+        for i in range(len(val)):
+            en = val[i]
+            if id(en) in bids:
+                res.append(en)
+                continue
+            if keys and kidx is None:
+                kidx = base.key_index(keys)
+                if kidx is None:
+                    kidx = {}
+            j = kidx.get(val._entry_key(i, keys)) if keys else None
+            res.append(None if j is None else base[j])
+        return res
+
+    def _changed_nodes(self, val: Optional[Value], bval: Optional[Value],
+                       res: Set[SchemaNode]) -> None:
+        """Extend the superclass method."""
+        if val is bval:
+            return
+        if not (isinstance(val, ArrayValue) or isinstance(bval, ArrayValue)):
+            super()._changed_nodes(val, bval, res)      # entry
+            return
+        res.add(self)
+        arr = val if isinstance(val, ArrayValue) else ArrayValue()
+        barr = bval if isinstance(bval, ArrayValue) else ArrayValue()
+        bents = self._base_entries(arr, barr)
+        for en, ben in zip(arr, bents):
+            super()._changed_nodes(en, ben, res)
+        paired = {id(ben) for ben in bents}
+        for ben in barr:
+            if id(ben) not in paired:
+                super()._changed_nodes(None, ben, res)
+
+    def _check_cardinality(self, inst: "InstanceNode",
+                           errors: "ValidationErrors" = None) -> None:
         if len(inst.value) < self.min_elements:
-            raise SemanticError(inst.json_pointer(), "too-few-elements")
+            self._report(SemanticError(
+                inst.json_pointer(), "too-few-elements"), errors)
         if (self.max_elements is not None and
                 len(inst.value) > self.max_elements):
-            raise SemanticError(inst.json_pointer(), "too-many-elements")
+            self._report(SemanticError(
+                inst.json_pointer(), "too-many-elements"), errors)
 
     def _post_process(self) -> None:
         super()._post_process()
@@ -946,6 +1493,43 @@ class SequenceNode(DataNode):
             res.append(self.entry_from_raw(en, "{}/{}".format(jptr, i)))
         return res
 
+    def _from_stream(self, parser: JSONStreamParser,
+                     jptr: JSONPointer) -> ArrayValue:
+        """Override the superclass method."""
+        if parser.peek() != "[":
+            raise RawTypeError(jptr, "array")
+        res = []
+        i = 0
+        for _ in parser.entries():
+            i += 1
+            res.append(super()._from_stream(parser, "{}/{}".format(jptr, i)))
+        return ArrayValue(res)
+
+    def _json_chunks(self, val: Value) -> Iterator[str]:
+        """Override the superclass method.
+
+        The receiver is used also for serializing a single entry.
+        """
+        if not isinstance(val, ArrayValue):
+            yield from super()._json_chunks(val)
+            return
+        sep = "["
+        for en in val:
+            yield sep
+            yield from super()._json_chunks(en)
+            sep = ","
+        yield "]" if sep == "," else "[]"
+
+    def _cooker(self) -> Callable[[RawList], ArrayValue]:
+        """Override the superclass method."""
+        ecook = super()._cooker()
+
+        def cook(rval: RawList) -> ArrayValue:
+            if not isinstance(rval, list):
+                raise RawTypeError("", "array")
+            return ArrayValue([ecook(en) for en in rval])
+        return cook
+
     def entry_from_raw(self, rval: RawEntry, jptr: JSONPointer = "") -> EntryValue:
         """Transform a raw (leaf-)list entry into the cooked form.
 
@@ -970,44 +1554,148 @@ class ListNode(SequenceNode, InternalNode):
         self.keys = []  # type: List[QualName]
         self._key_members = []
         self.unique = []  # type: List[List[SchemaRoute]]
+        self._unique_steps = []  # type: List[List[Optional[List[Tuple]]]]
 
     def _node_digest(self) -> Dict[str, Any]:
         res = super()._node_digest()
         res["keys"] = self._key_members
         return res
 
-    def _check_list_props(self, inst: "InstanceNode") -> None:
+    def _check_list_props(self, inst: "InstanceNode",
+                          errors: "ValidationErrors" = None) -> None:
         """Check uniqueness of keys and "unique" properties, if applicable."""
         if self.keys:
-            self._check_keys(inst)
-        for u in self.unique:
-            self._check_unique(u, inst)
+            self._check_keys(inst, errors)
+        if self.unique:
+            self._check_unique(inst, errors)
 
-    def _check_keys(self, inst: "InstanceNode") -> None:
+    def _check_keys(self, inst: "InstanceNode",
+                    errors: "ValidationErrors" = None) -> None:
         ukeys = set()
         for i in range(len(inst.value)):
             en = inst.value[i]
             try:
                 kval = tuple([en[k] for k in self._key_members])
             except KeyError as e:
-                raise SchemaError(inst._entry(i).json_pointer(),
-                                  "list-key-missing", e.args[0]) from None
+                self._report(SchemaError(inst._entry(i).json_pointer(),
+                                         "list-key-missing", e.args[0]), errors)
+                continue
             if kval in ukeys:
-                raise SemanticError(inst.json_pointer(), "non-unique-key", repr(
-                    kval[0] if len(kval) < 2 else kval))
+                self._report(SemanticError(
+                    inst.json_pointer(), "non-unique-key",
+                    repr(kval[0] if len(kval) < 2 else kval)), errors)
             ukeys.add(kval)
 
-    def _check_unique(self, unique: List[SchemaRoute],
-                      inst: "InstanceNode") -> None:
-        uvals = set()
-        for en in inst:
-            den = en.add_defaults()
-            uval = tuple([den._peek_schema_route(sr) for sr in unique])
-            if None not in uval:
-                if uval in uvals:
-                    raise SemanticError(inst.json_pointer(), "data-not-unique")
+    def _check_unique(self, inst: "InstanceNode",
+                      errors: "ValidationErrors" = None) -> None:
+        """Check all "unique" properties in one pass over the entries."""
+        uvals = [set() for u in self.unique]
+        for i in range(len(inst.value)):
+            ev = inst.value[i]
+            den = None
+            for u in range(len(self.unique)):
+                uval = []
+                for sr, steps in zip(self.unique[u], self._unique_steps[u]):
+                    val = (self._NEEDS_INSTANCE if steps is None else
+                           self._unique_value(ev, steps))
+                    if val is self._NEEDS_INSTANCE:
+                        if den is None:
+                            den = inst._entry(i).add_defaults()
+                        val = den._peek_schema_route(sr)
+                    if val is None:
+                        break
+                    uval.append(val)
                 else:
-                    uvals.add(uval)
+                    uval = tuple(uval)
+                    if uval in uvals[u]:
+                        self._report(SemanticError(
+                            inst.json_pointer(), "data-not-unique"), errors)
+                    else:
+                        uvals[u].add(uval)
+
+    _NEEDS_INSTANCE = object()
+    """Value returned by :meth:`_unique_value` if *when* has to be evaluated."""
+
+    @classmethod
+    def _unique_value(cls, val: ObjectValue, steps: List[Tuple]) -> Any:
+        """Return the value of a leaf with defaults, without adding them.
+
+        Args:
+            val: Value of a list entry.
+            steps: Result of :meth:`_unique_route`.
+
+        Returns:
+            ``None`` if the leaf has no value, or :attr:`_NEEDS_INSTANCE`
+            if its default is subject to a *when* condition.
+        """
+        for iname, cases, dflt, when in steps:
+            try:
+                val = val[iname]
+                continue
+            except (KeyError, TypeError):
+                pass
+            if dflt is None:
+                return None
+            if when:
+                return cls._NEEDS_INSTANCE
+            for c in cases:
+                ch = c._choice()
+                ac = ch._active_case(val)
+                if (c is not ac if ac else
+                        c.qual_name != ch.default_case):
+                    return None
+            return dflt
+        return val
+
+    def _unique_route(self, sroute: SchemaRoute) -> Optional[List[Tuple]]:
+        """Prepare the resolution of a "unique" route on entry values.
+
+        Each data node on the route contributes a tuple consisting of
+        its instance name, the case nodes above it, the default value
+        that :meth:`.InstanceNode.add_defaults` would give to the leaf
+        if the data node is missing (provided that the cases are
+        active), and a flag indicating that this default depends on
+        *when* conditions.
+
+        Returns:
+            ``None`` if the route doesn't lead to a leaf.
+        """
+        sn = self
+        groups = []
+        nodes = []
+        for qn in sroute:
+            sn = sn.get_child(*qn)
+            if sn is None:
+                return None
+            nodes.append(sn)
+            if isinstance(sn, DataNode):
+                groups.append(nodes)
+                nodes = []
+        if not isinstance(sn, LeafNode):
+            return None
+        res = []
+        dflt = sn.default
+        when = False
+        for nodes in reversed(groups):
+            for n in nodes:
+                p = n
+                while True:
+                    when = when or p.when is not None
+                    p = p.parent
+                    if (not isinstance(p, GroupNode) or
+                            isinstance(p, SchemaTreeNode)):
+                        break
+                if not n.content_type().value & n.parent.content_type().value:
+                    dflt = None
+            dn = nodes[-1]
+            cases = [n for n in nodes if isinstance(n, CaseNode)]
+            res.append((dn.iname(), cases, dflt, when))
+            if not (isinstance(dn, ContainerNode) and not dn.presence):
+                dflt = None
+            if any([c.qual_name != c._choice().default_case for c in cases]):
+                dflt = None             # no active case under a default
+        res.reverse()
+        return res
 
     def _default_instance(self, pnode: "InstanceNode", ctype: ContentType,
                           lazy: bool = False) -> "InstanceNode":
@@ -1015,6 +1703,8 @@ class ListNode(SequenceNode, InternalNode):
 
     def _post_process(self) -> None:
         super()._post_process()
+        self._unique_steps = [[self._unique_route(sr) for sr in u]
+                              for u in self.unique]
         for k in self.keys:
             kn = self.get_data_child(*k)
             self._key_members.append(kn.iname())
@@ -1081,12 +1771,24 @@ class ChoiceNode(InternalNode):
         else:
             return inst
 
-    def _active_case(self, value: ObjectValue) -> Optional["CaseNode"]:
-        """Return receiver's case that's active in an instance node value."""
-        for c in self.children:
-            for cc in c.data_children():
-                if cc.iname() in value:
-                    return c
+    def _active_case(self, value: ObjectValue,
+                     node: InternalNode = None) -> Optional["CaseNode"]:
+        """Return receiver's case that's active in an instance node value.
+
+        Args:
+            value: Value of an instance node.
+            node: Conditional group under the receiver to search (the
+                receiver itself if ``None``).
+        """
+        for c in (node or self).children:
+            if isinstance(c, CaseNode):
+                for cc in c.data_children():
+                    if cc.iname() in value:
+                        return c
+            elif isinstance(c, GroupNode):
+                ac = self._active_case(value, c)
+                if ac:
+                    return ac
 
     def _pattern_entry(self) -> SchemaPattern:
         if not self.children:
@@ -1141,6 +1843,29 @@ class ChoiceNode(InternalNode):
 class CaseNode(InternalNode):
     """Case node."""
 
+    def _overlay_active(self, inst: "InstanceNode") -> bool:
+        """Return ``True`` if defaults under the receiver apply in `inst`.
+
+        This is the case if the receiver is the active case, or if no
+        case is active and the receiver is the default case. The
+        """
+        choice = self._choice()
+        ac = choice._active_case(inst.value)
+        if ac is not None:
+            return ac is self
+        return (self.qual_name == choice.default_case and
+                (self.when is None or self.when.evaluate(inst)))
+
+    def _choice(self) -> ChoiceNode:
+        """Return the choice node of the receiver.
+
+        The receiver may be separated from it by conditional groups.
+        """
+        res = self.parent
+        while not isinstance(res, ChoiceNode):
+            res = res.parent
+        return res
+
     def _pattern_entry(self) -> SchemaPattern:
         return super()._schema_pattern()
 
@@ -1157,6 +1882,8 @@ class LeafNode(DataNode, TerminalNode):
         """Initialize the class instance."""
         super().__init__()
         self._mandatory = False  # type: bool
+        self._needs_instance = True  # type: bool
+        """Flag indicating that validation has to evaluate XPath."""
 
     @property
     def mandatory(self) -> bool:
@@ -1178,6 +1905,28 @@ class LeafNode(DataNode, TerminalNode):
             self.parent._add_mandatory_child(self)
         elif self._default is not None:
             self._default = self.type.from_yang(self._default)
+        self._needs_instance = bool(self.must) or (
+            isinstance(self.type, LinkType) and self.type.require_instance)
+
+    def _validate_member(self, pinst: "InstanceNode", name: InstanceName,
+                         scope: ValidationScope, base: Value = None,
+                         errors: "ValidationErrors" = None) -> None:
+        """Validate an instance of the receiver without an instance node.
+
+        This is equivalent to :meth:`_validate` for leaves that have
+        no constraints requiring an instance node as the context, see
+        :attr:`_needs_instance`.
+
+        Args:
+            pinst: Parent instance containing the receiver's instance.
+            name: Instance name of the receiver's instance.
+        """
+        val = pinst.value[name]
+        if (scope.value & ValidationScope.syntax.value and
+                val is not base and val not in self.type):
+            self._report(YangTypeError(
+                pinst._member(name).json_pointer(), self.type.error_tag,
+                self.type.error_message), errors)
 
     def _tree_line(self, no_type: bool = False) -> str:
         res = super()._tree_line() + ("" if self._mandatory else "?")
@@ -1203,10 +1952,12 @@ class LeafListNode(SequenceNode, TerminalNode):
     def _yang_class(self) -> str:
         return "leaf-list"
 
-    def _check_list_props(self, inst: "InstanceNode") -> None:
+    def _check_list_props(self, inst: "InstanceNode",
+                          errors: "ValidationErrors" = None) -> None:
         if (self.content_type() == ContentType.config and
                 len(set(inst.value)) < len(inst.value)):
-            raise SemanticError(inst.json_pointer(), "repeated-leaf-list-value")
+            self._report(SemanticError(
+                inst.json_pointer(), "repeated-leaf-list-value"), errors)
 
     def _default_stmt(self, stmt: Statement, sctx: SchemaContext) -> None:
         if self._default is None:
@@ -1358,6 +2109,8 @@ class NotificationNode(SchemaTreeNode):
         return super()._tree_line_prefix() + "-n"
 
 
-from .xpathast import Expr, LocationPath, Step, Root        # NOQA
+from .xpathast import (DependencyContext, Expr, LocationPath,  # NOQA
+                       Step, Root)
 from .instance import (ArrayEntry, EmptyList, InstanceNode,  # NOQA
-                       InstanceRoute, MemberName, ObjectMember)
+                       InstanceRoute, MemberName, ObjectMember,
+                       ValidationErrors)
@@ -17,7 +17,7 @@
 
 """This module defines classes for schema patterns."""
 
-from typing import List, Optional
+from typing import Dict, Hashable, List, Optional
 from .enumerations import ContentType
 from .typealiases import InstanceName, _Singleton, YangIdentifier
 from .xpathast import Expr
@@ -51,6 +51,18 @@ class SchemaPattern:
     def _mandatory_members(self, ctype: ContentType) -> List[InstanceName]:
         return []
 
+    def _conditions(self) -> List["Conditional"]:
+        """Return conditional subpatterns of the receiver with a when."""
+        return []
+
+    def _key(self) -> Hashable:
+        """Return a key identifying the receiver's structure.
+
+        Patterns that are created by derivation get a structural key,
+        all others are identified by the object itself.
+        """
+        return self
+
 
 class Empty(SchemaPattern, metaclass=_Singleton):
     """Singleton class representing the empty pattern."""
@@ -105,6 +117,9 @@ class Conditional(SchemaPattern):
     def _eval_when(self, cnode: "InstanceNode") -> None:
         self._val_when = bool(self.when.evaluate(cnode))
 
+    def _conditions(self) -> List["Conditional"]:
+        return [self] if self.when else []
+
     def _active(self, ctype: ContentType) -> bool:
         return super()._active(ctype) and self.check_when()
 
@@ -154,6 +169,9 @@ class ConditionalPattern(Conditional):
     def _mandatory_members(self, ctype: ContentType) -> List[InstanceName]:
         return (self.pattern._mandatory_members(ctype) if self._active(ctype) else [])
 
+    def _conditions(self) -> List[Conditional]:
+        return super()._conditions() + self.pattern._conditions()
+
 
 class Member(Typeable, Conditional):
 
@@ -229,6 +247,12 @@ class Alternative(SchemaPattern):
         rm = self.right._mandatory_members(ctype)
         return [] if not lm or not rm else lm + rm
 
+    def _conditions(self) -> List[Conditional]:
+        return self.left._conditions() + self.right._conditions()
+
+    def _key(self) -> Hashable:
+        return (Alternative, self.left._key(), self.right._key())
+
 
 class ChoicePattern(Alternative, Typeable):
 
@@ -253,6 +277,9 @@ class ChoicePattern(Alternative, Typeable):
     def _members(self, ctype: ContentType) -> List[InstanceName]:
         return (super()._members(ctype) if self._active(ctype) else [])
 
+    def _key(self) -> Hashable:
+        return self
+
 
 class Pair(SchemaPattern):
 
@@ -297,3 +324,79 @@ class Pair(SchemaPattern):
 
     def _mandatory_members(self, ctype: ContentType) -> List[InstanceName]:
         return self.left._mandatory_members(ctype) + self.right._mandatory_members(ctype)
+
+    def _conditions(self) -> List[Conditional]:
+        return self.left._conditions() + self.right._conditions()
+
+    def _key(self) -> Hashable:
+        return (Pair, self.left._key(), self.right._key())
+
+
+class PatternAutomaton:
+    """Deterministic automaton accepting the members of a schema pattern.
+
+    States are derivatives of the pattern, and transitions are labelled
+    with instance names. Both are computed lazily on the first visit,
+    so that repeated checks of similar objects are mere table lookups.
+    Derivatives with the same structure are merged into one state.
+
+    The automaton is only valid for the content type, and the values of
+    all **when** conditions, for which it was built.
+    """
+
+    max_states = 1000
+    """Number of states after which the automaton is to be rebuilt."""
+
+    def __init__(self, pattern: SchemaPattern, ctype: ContentType):
+        """Initialize the class instance.
+
+        Args:
+            pattern: Schema pattern corresponding to the initial state.
+            ctype: Content type.
+        """
+        self.ctype = ctype
+        self.states = [pattern]  # type: List[SchemaPattern]
+        self._index = {pattern._key(): 0}  # type: Dict[Hashable, int]
+        self._trans = [{}]  # type: List[Dict[InstanceName, Optional[int]]]
+        self._nullable = [None]  # type: List[Optional[bool]]
+
+    def full(self) -> bool:
+        """Return ``True`` if the receiver has too many states."""
+        return len(self.states) >= self.max_states
+
+    def step(self, state: int, name: InstanceName) -> Optional[int]:
+        """Return the state after member `name`.
+
+        Args:
+            state: Current state.
+            name: Instance name of the member.
+
+        Returns:
+            ``None`` if the member is not allowed.
+        """
+        trans = self._trans[state]
+        try:
+            return trans[name]
+        except KeyError:
+            pass
+        p = self.states[state].deriv(name, self.ctype)
+        if isinstance(p, NotAllowed):
+            res = None
+        else:
+            key = p._key()
+            res = self._index.get(key)
+            if res is None:
+                res = self._index[key] = len(self.states)
+                self.states.append(p)
+                self._trans.append({})
+                self._nullable.append(None)
+        trans[name] = res
+        return res
+
+    def nullable(self, state: int) -> bool:
+        """Return ``True`` if `state` may be the final state."""
+        res = self._nullable[state]
+        if res is None:
+            res = self._nullable[state] = self.states[state].nullable(
+                self.ctype)
+        return res
@@ -23,7 +23,8 @@ This module implements the following classes:
 * Statement: YANG statements.
 """
 
-from typing import List, Optional, Tuple
+import re
+from typing import Dict, List, Optional, Tuple
 from .exceptions import (
     EndOfInput, StatementNotFound, UnexpectedInput, InvalidArgument,
     ModuleNameMismatch, ModuleRevisionMismatch)
@@ -133,6 +134,19 @@ class ModuleParser(Parser):
                     "\\": "\\"}  # type: Dict[str,str]
     """Dictionary for mapping escape sequences to characters."""
 
+    sep_re = re.compile(r"(?:[ \t\n]+|\r\n|//[^\n]*\n|/\*.*?\*/)*",
+                        re.DOTALL)
+    """Regular expression for optional separator (whitespace and comments)."""
+
+    dq_re = re.compile(r'(?:[^"\\]+|\\.)*', re.DOTALL)
+    """Regular expression for the contents of a double-quoted string."""
+
+    unq_re = re.compile(r"(?:[^;{ \t\r\n/]+|/[^/*])*")
+    """Regular expression for unquoted argument."""
+
+    escape_re = re.compile(r"\\(.)", re.DOTALL)
+    """Regular expression for escape sequences."""
+
     def __init__(self, text: str, name: YangIdentifier = None, rev: str = None):
         """Initialize the parser instance.
 
@@ -174,9 +188,39 @@ class ModuleParser(Parser):
             return res
         raise UnexpectedInput(self, "end of input")
 
-    def _back_break(self) -> int:
-        self.offset -= 1
-        return -1
+    def header(self) -> Tuple[YangIdentifier, Optional[str]]:
+        """Parse the (sub)module name and the most recent revision date.
+
+        Substatements are parsed only up to the first **revision**
+        statement, so that this is much cheaper than :meth:`parse`.
+
+        Returns:
+            Name of the (sub)module and the argument of its first
+            **revision** statement (``None`` if there is no such
+            statement).
+
+        Raises:
+            EndOfInput: If past the end of input.
+            UnexpectedInput: If top-level statement isn't ``(sub)module``.
+        """
+        self.opt_separator()
+        start = self.offset
+        if self.keyword() not in [(None, "module"), (None, "submodule")]:
+            self.offset = start
+            raise UnexpectedInput(self, "'module' or 'submodule'")
+        self.separator()
+        self._arg = ""
+        if not self.argument():
+            raise UnexpectedInput(self, "'{'")
+        name = self._arg
+        self.offset += 1
+        self.opt_separator()
+        while self.peek() != "}":
+            stmt = self.statement()
+            if stmt.keyword == "revision" and stmt.prefix is None:
+                return (name, stmt.argument)
+            self.opt_separator()
+        return (name, None)
 
     @classmethod
     def unescape(cls, text: str) -> str:
@@ -185,13 +229,12 @@ class ModuleParser(Parser):
         Args:
             text: Text to unescape.
         """
-        chop = text.split("\\", 1)
-        try:
-            return (chop[0] if len(chop) == 1
-                    else chop[0] + cls.unescape_map[chop[1][0]] +
-                    cls.unescape(chop[1][1:]))
-        except KeyError:
-            raise InvalidArgument(text) from None
+        def repl(mo):
+            try:
+                return cls.unescape_map[mo.group(1)]
+            except KeyError:
+                raise InvalidArgument(text) from None
+        return cls.escape_re.sub(repl, text)
 
     def opt_separator(self) -> bool:
         """Parse an optional separator and return ``True`` if found.
@@ -200,37 +243,12 @@ class ModuleParser(Parser):
             EndOfInput: If past the end of input.
         """
         start = self.offset
-        self.dfa([
-            {  # state 0: whitespace
-                "": lambda: -1,
-                " ": lambda: 0,
-                "\t": lambda: 0,
-                "\n": lambda: 0,
-                "\r": lambda: 1,
-                "/": lambda: 2
-            },
-            {  # state 1: CR/LF?
-                "": self._back_break,
-                "\n": lambda: 0
-            },
-            {  # state 2: start comment?
-                "": self._back_break,
-                "/": lambda: 3,
-                "*": lambda: 4
-            },
-            {  # state 3: line comment
-                "": lambda: 3,
-                "\n": lambda: 0
-            },
-            {  # state 4: block comment
-                "": lambda: 4,
-                "*": lambda: 5
-            },
-            {  # state 5: end block comment?
-                "": lambda: 4,
-                "/": lambda: 0,
-                "*": lambda: 5
-            }])
+        self.offset = self.sep_re.match(self.input, start).end()
+        rest = len(self.input) - self.offset
+        if (rest == 0 or (rest == 1 and self.input[-1] in "\r/") or
+                self.input.startswith(("//", "/*"), self.offset)):
+            self.offset = len(self.input)
+            raise EndOfInput(self)
         return start < self.offset
 
     def separator(self) -> None:
@@ -334,23 +352,14 @@ class ModuleParser(Parser):
         Raises:
             EndOfInput: If past the end of input.
         """
-        def escape():
-            self._escape = True
-            return 1
-        self._escape = False                 # any escaped chars?
         self.offset += 1
         start = self.offset
-        self.dfa([
-            {  # state 0: argument
-                "": lambda: 0,
-                '"': lambda: -1,
-                "\\": escape
-            },
-            {  # state 1: after escape
-                "": lambda: 0
-            }])
-        self._arg += (self.unescape(self.input[start:self.offset])
-                      if self._escape else self.input[start:self.offset])
+        self.offset = self.dq_re.match(self.input, start).end()
+        if not self.input.startswith('"', self.offset):
+            self.offset = len(self.input)
+            raise EndOfInput(self)
+        arg = self.input[start:self.offset]
+        self._arg += self.unescape(arg) if "\\" in arg else arg
         self.offset += 1
 
     def unq_argument(self) -> str:
@@ -360,22 +369,10 @@ class ModuleParser(Parser):
             EndOfInput: If past the end of input.
         """
         start = self.offset
-        self.dfa([
-            {  # state 0: argument
-                "": lambda: 0,
-                ";": lambda: -1,
-                " ": lambda: -1,
-                "\t": lambda: -1,
-                "\r": lambda: -1,
-                "\n": lambda: -1,
-                "{": lambda: -1,
-                '/': lambda: 1
-            },
-            {  # state 1: comment?
-                "": lambda: 0,
-                "/": self._back_break,
-                "*": self._back_break
-            }])
+        self.offset = self.unq_re.match(self.input, start).end()
+        if self.offset >= len(self.input) - (self.input[-1] == "/"):
+            self.offset = len(self.input)
+            raise EndOfInput(self)
         self._arg = self.input[start:self.offset]
 
     def substatements(self) -> List[Statement]:
@@ -26,15 +26,20 @@ class is intended to be public:
 
 import decimal
 from math import ceil, copysign, floor
+import operator
 from pyxb.utils.xmlre import XMLToPython, RegularExpressionError
 import re
-from typing import List, Optional, Tuple
+import threading
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Set,
+                    Tuple)
 from .schemadata import SchemaContext
 from .enumerations import Axis, MultiplicativeOp
 from .exceptions import InvalidArgument, XPathTypeError
 from .instance import InstanceNode
 from .nodeset import NodeExpr, NodeSet, XPathValue
 from .typealiases import QualName
+if False:                       # fake import for type aliases
+    from .schemanode import SchemaNode
 
 
 class XPathContext:
@@ -50,15 +55,79 @@ class XPathContext:
         return self.__class__(new_cnode, self.origin, self.position, self.size)
 
 
+XPathFun = Callable[[XPathContext], XPathValue]
+"""Compiled XPath expression."""
+
+
+class _EvaluationCache(threading.local):
+    """Cache of values of XPath subexpressions that don't depend on context.
+
+    The cache is enabled for the current thread inside a ``with``
+    statement, typically for one validation pass. Values are cached per
+    data tree, so they must not be modified by the caller.
+    """
+
+    def __init__(self):
+        self.entries = None  # type: Optional[Dict[Tuple, Tuple]]
+        self._depth = 0
+
+    def __enter__(self) -> None:
+        if self._depth == 0:
+            self.entries = {}
+        self._depth += 1
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self.entries = None
+
+
+_eval_cache = _EvaluationCache()
+
+PredicatesFun = Callable[["NodeSet", XPathContext], "NodeSet"]
+"""Compiled sequence of predicates."""
+
+NodesFun = Callable[[XPathContext], Iterator[InstanceNode]]
+"""Compiled location path producing nodes lazily."""
+
+
+class DependencyContext:
+    """Context for static analysis of XPath expressions."""
+
+    def __init__(self, cnode: "SchemaNode", origin: "SchemaNode",
+                 deps: Set["SchemaNode"], ups: Set["SchemaNode"]):
+        self.cnode = cnode
+        self.origin = origin
+        self.deps = deps
+        """Schema nodes whose instances may be read."""
+        self.ups = ups
+        """Schema nodes whose instances may be reached by moving up."""
+
+    def update_cnode(self, new_cnode: "SchemaNode") -> "DependencyContext":
+        return self.__class__(new_cnode, self.origin, self.deps, self.ups)
+
+
 class Expr:
     """Abstract class for nodes of XPath AST."""
 
     indent = 2
 
+    _fun = None  # type: Optional[XPathFun]
+    """Compiled receiver."""
+
     def __str__(self) -> str:
         """Return a string representation of the receiver's AST."""
         return self._tree()
 
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the receiver's state for pickling.
+
+        The compiled function is left out, it is recreated on demand.
+        """
+        res = self.__dict__.copy()
+        res.pop("_fun", None)
+        return res
+
     def evaluate(self, node: InstanceNode) -> XPathValue:
         """Evaluate the receiver and return the result.
 
@@ -69,28 +138,193 @@ class Expr:
             XPathTypeError: If a subexpression of the receiver is of a wrong
                 type.
         """
-        return self._eval(XPathContext(node, node, 1, 1))
+        return self._function()(XPathContext(node, node, 1, 1))
 
-    def _eval_float(self, xctx: XPathContext) -> float:
-        val = self._eval(xctx)
-        try:
-            return float(val)
-        except ValueError:
-            return float('nan')
+    def _function(self) -> XPathFun:
+        """Return the receiver compiled into a Python function.
 
-    def _eval_string(self, xctx: XPathContext) -> str:
-        val = self._eval(xctx)
-        if isinstance(val, float):
+        The function is created on the first call and cached.
+        """
+        if self._fun is None:
+            self._fun = self._fold(self._compile())
+        return self._fun
+
+    def _nodes_function(self) -> Optional[NodesFun]:
+        """Compile the receiver into a function iterating over nodes.
+
+        The nodes are generated lazily, so that the caller can stop as
+        soon as it has seen enough of them. Unlike in the node-set
+        returned by :meth:`_function`, the same node may appear
+        repeatedly.
+
+        Returns:
+            ``None`` if the receiver is not a location path or union
+            whose steps have no predicates.
+        """
+        return None
+
+    def _compile(self) -> XPathFun:
+        """Compile the receiver into a Python function.
+
+        Everything that doesn't depend on the context (such as the
+        choice of an axis or operator) is resolved in advance.
+        """
+        raise NotImplementedError
+
+    def _constant(self) -> bool:
+        """Return ``True`` if the receiver's value doesn't depend on context."""
+        ops = self._operands()
+        return bool(ops) and all([op._constant() for op in ops])
+
+    def _context_free(self) -> bool:
+        """Return ``True`` if the receiver's value depends only on data.
+
+        Such a value is the same for all context nodes in the same data
+        tree.
+        """
+        if self._constant():
+            return True
+        ops = self._operands()
+        return bool(ops) and all([op._context_free() for op in ops])
+
+    def _uses_current(self) -> bool:
+        """Return ``True`` if the receiver contains ``current()``."""
+        return any([op._uses_current() for op in self._operands()])
+
+    def _cnode_free(self) -> bool:
+        """Return ``True`` if the receiver doesn't depend on the context node.
+
+        Such a value may still depend on the data tree and ``current()``,
+        but not on the context node, position and size.
+        """
+        if self._constant():
+            return True
+        ops = self._operands()
+        return bool(ops) and all([op._cnode_free() for op in ops])
+
+    def _cached(self, fun: XPathFun) -> XPathFun:
+        """Make `fun` use the evaluation cache if it is enabled.
+
+        The receiver has to be context-free, see :meth:`_context_free`.
+        """
+        def cached(xctx: XPathContext) -> XPathValue:
+            entries = _eval_cache.entries
+            if entries is None:
+                return fun(xctx)
+            root = xctx.cnode._root_value()
+            if root is None:            # modified tree
+                return fun(xctx)
+            key = (self, id(root), xctx.origin.namespace)
             try:
-                if int(val) == val:
-                    return str(int(val))
-            except OverflowError:
-                return "Infinity" if val > 0 else "-Infinity"
-            except ValueError:
-                return "NaN"
-        if isinstance(val, bool):
-            return str(val).lower()
-        return str(val)
+                return entries[key][0]
+            except KeyError:
+                pass
+            res = fun(xctx)
+            entries[key] = (res, root)  # keep root alive so as to fix its id
+            return res
+        return cached
+
+    def _ups(self) -> Optional[int]:
+        """Return the number of steps if the receiver is a chain of ``..``."""
+        return None
+
+    def _anchor(self) -> Optional[int]:
+        """Return the number of parent steps to the node the receiver needs.
+
+        The receiver's value is the same for all context nodes having
+        the same ancestor that many levels up.
+        """
+        return None
+
+    def _string_index(
+            self, node: InstanceNode) -> Optional[Dict[str, NodeSet]]:
+        """Return nodes of the receiver's value indexed by string value.
+
+        The index is built once per validation pass and data tree, and
+        then shared by all context nodes for which the receiver selects
+        the same nodes.
+
+        Args:
+            node: Context node.
+
+        Returns:
+            ``None`` if the evaluation cache is disabled, the data tree
+            has been modified, or the receiver depends on the context node
+            in another way.
+        """
+        entries = _eval_cache.entries
+        if entries is None:
+            return None
+        if self._context_free():
+            anchor = ()
+        else:
+            k = self._anchor()
+            if k is None:
+                return None
+            inst = node
+            for _ in range(k):
+                if inst.parinst is None:
+                    return None
+                if isinstance(inst.path[-1], int):  # skip the array
+                    inst = inst.parinst
+                inst = inst.parinst
+            anchor = inst.path
+        root = node._root_value()
+        if root is None:
+            return None
+        key = (self, "index", id(root), node.namespace, anchor)
+        try:
+            return entries[key][0]
+        except KeyError:
+            pass
+        ns = self.evaluate(node)
+        if not isinstance(ns, NodeSet):
+            return None
+        res = {}
+        for n in ns:
+            res.setdefault(str(n), []).append(n)
+        entries[key] = (res, root)
+        return res
+
+    def _fold(self, fun: XPathFun) -> XPathFun:
+        """Replace `fun` with a constant function if possible."""
+        if not self._constant():
+            return fun
+        try:
+            val = fun(None)
+        except Exception:               # raise it during evaluation
+            return fun
+        return lambda xctx: val
+
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        """Analyze data dependencies of the receiver.
+
+        Schema nodes whose instances may be read during evaluation of
+        the receiver are added to the context.
+
+        Args:
+            dctx: Context of the analysis.
+
+        Returns:
+            Schema nodes of instances that the resulting node-set may
+            contain.
+        """
+        for op in self._operands():
+            dctx.deps.update(op._analyze(dctx))
+        return set()
+
+    def _operands(self) -> List["Expr"]:
+        return []
+
+    def _float_function(self) -> XPathFun:
+        """Return compiled receiver whose result is converted to number."""
+        fun = self._function()
+        return self._fold(lambda xctx: _to_float(fun(xctx)))
+
+    def _string_function(self) -> XPathFun:
+        """Return compiled receiver whose result is converted to string."""
+        fun = self._function()
+        return self._fold(lambda xctx: _to_string(fun(xctx)))
 
     def _tree(self, indent: int = 0) -> str:
         node_name = self.__class__.__name__
@@ -114,23 +348,42 @@ class Expr:
             res += p._tree(newi)
         return res
 
-    def _apply_predicates(self, ns: XPathValue,
-                          xctx: XPathContext) -> XPathValue:
+    def _analyze_predicates(self, nodes: Set["SchemaNode"],
+                            dctx: DependencyContext) -> Set["SchemaNode"]:
         for p in self.predicates:
-            res = NodeSet([])
-            size = len(ns)
-            for i in range(size):
-                pval = p._eval(XPathContext(ns[i], xctx.origin, i + 1, size))
-                try:
-                    if isinstance(pval, float) and pval > 0:
-                        res.append(ns[int(pval) - 1])
-                        break
-                except IndexError:
-                    return res
-                if pval:
-                    res.append(ns[i])
-            ns = res
-        return ns
+            for n in nodes:
+                dctx.deps.update(p._analyze(dctx.update_cnode(n)))
+            if isinstance(p, _numeric_exprs):     # position may matter
+                dctx.deps.update(nodes)
+        return nodes
+
+    def _predicates_function(self, skip: int = 0) -> Optional[PredicatesFun]:
+        """Compile the receiver's predicates (``None`` if there are none).
+
+        Args:
+            skip: Number of leading predicates to leave out.
+        """
+        if len(self.predicates) <= skip:
+            return None
+        preds = [p._function() for p in self.predicates[skip:]]
+
+        def apply(ns: XPathValue, xctx: XPathContext) -> XPathValue:
+            for pfun in preds:
+                res = NodeSet([])
+                size = len(ns)
+                for i in range(size):
+                    pval = pfun(XPathContext(ns[i], xctx.origin, i + 1, size))
+                    try:
+                        if isinstance(pval, float) and pval > 0:
+                            res.append(ns[int(pval) - 1])
+                            break
+                    except IndexError:
+                        return res
+                    if pval:
+                        res.append(ns[i])
+                ns = res
+            return ns
+        return apply
 
 
 class UnaryExpr(Expr):
@@ -142,6 +395,14 @@ class UnaryExpr(Expr):
     def _children_str(self, indent: int) -> str:
         return self.expr._tree(indent) if self.expr else ""
 
+    def _operands(self) -> List[Expr]:
+        return [self.expr] if self.expr else []
+
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        if self.expr is None:           # context node is the argument
+            dctx.deps.add(dctx.cnode)
+        return super()._analyze(dctx)
+
 
 class BinaryExpr(Expr):
     """Abstract superclass of binary expressions."""
@@ -153,28 +414,70 @@ class BinaryExpr(Expr):
     def _children_str(self, indent: int) -> str:
         return self.left._tree(indent) + self.right._tree(indent)
 
-    def _eval_ops(self, xctx: XPathContext) -> Tuple[XPathValue, XPathValue]:
-        return (self.left._eval(xctx), self.right._eval(xctx))
+    def _operands(self) -> List[Expr]:
+        return [self.left, self.right]
 
-    def _eval_ops_float(self, xctx: XPathContext) -> Tuple[float, float]:
-        return (self.left._eval_float(xctx), self.right._eval_float(xctx))
+    def _ops_functions(self) -> Tuple[XPathFun, XPathFun]:
+        return (self.left._function(), self.right._function())
 
-    def _eval_ops_string(self, xctx: XPathContext) -> Tuple[str, str]:
-        return (self.left._eval_string(xctx), self.right._eval_string(xctx))
+    def _ops_float_functions(self) -> Tuple[XPathFun, XPathFun]:
+        return (self.left._float_function(), self.right._float_function())
+
+    def _ops_string_functions(self) -> Tuple[XPathFun, XPathFun]:
+        return (self.left._string_function(), self.right._string_function())
+
+    def _compile_comparison(self, op: Callable[[XPathValue, XPathValue],
+                                               bool]) -> XPathFun:
+        """Compile the receiver as comparison `op` of its operands.
+
+        If an operand can be evaluated lazily (see
+        :meth:`_nodes_function`), its nodes are compared one by one
+        and the evaluation stops at the first one that satisfies `op`.
+        """
+        left, right = self._ops_functions()
+        lnodes = self.left._nodes_function()
+        if lnodes is not None:
+            def fun(xctx: XPathContext) -> bool:
+                rval = right(xctx)
+                return any(op(NodeSet([n]), rval) for n in lnodes(xctx))
+            return fun
+        rnodes = self.right._nodes_function()
+        if rnodes is not None:
+            def fun(xctx: XPathContext) -> bool:
+                lval = left(xctx)
+                return any(op(lval, NodeSet([n])) for n in rnodes(xctx))
+            return fun
+        return lambda xctx: op(left(xctx), right(xctx))
+
+    def _compile_string_op(self, op: Callable[[str, str], XPathValue]
+                           ) -> XPathFun:
+        """Compile the receiver as `op` applied to string operands."""
+        left, right = self._ops_string_functions()
+        return lambda xctx: op(left(xctx), right(xctx))
 
 
 class OrExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
-        return lres or rres
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_functions()
+
+        def fun(xctx: XPathContext) -> XPathValue:
+            lres = left(xctx)
+            rres = right(xctx)
+            return lres or rres
+        return fun
 
 
 class AndExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
-        return lres and rres
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_functions()
+
+        def fun(xctx: XPathContext) -> XPathValue:
+            lres = left(xctx)
+            rres = right(xctx)
+            return lres and rres
+        return fun
 
 
 class EqualityExpr(BinaryExpr):
@@ -186,9 +489,9 @@ class EqualityExpr(BinaryExpr):
     def _properties_str(self) -> str:
         return "!=" if self.negate else "="
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
-        return lres != rres if self.negate else lres == rres
+    def _compile(self) -> XPathFun:
+        return self._compile_comparison(
+            operator.ne if self.negate else operator.eq)
 
 
 class RelationalExpr(BinaryExpr):
@@ -205,11 +508,12 @@ class RelationalExpr(BinaryExpr):
             res += "="
         return res
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
+    def _compile(self) -> XPathFun:
         if self.less:
-            return lres <= rres if self.equal else lres < rres
-        return lres >= rres if self.equal else lres > rres
+            op = operator.le if self.equal else operator.lt
+        else:
+            op = operator.ge if self.equal else operator.gt
+        return self._compile_comparison(op)
 
 
 class AdditiveExpr(BinaryExpr):
@@ -221,9 +525,10 @@ class AdditiveExpr(BinaryExpr):
     def _properties_str(self) -> str:
         return "+" if self.plus else "-"
 
-    def _eval(self, xctx: XPathContext) -> float:
-        lres, rres = self._eval_ops_float(xctx)
-        return lres + rres if self.plus else lres - rres
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_float_functions()
+        op = operator.add if self.plus else operator.sub
+        return lambda xctx: op(left(xctx), right(xctx))
 
 
 class MultiplicativeExpr(BinaryExpr):
@@ -241,20 +546,27 @@ class MultiplicativeExpr(BinaryExpr):
         if self.operator == MultiplicativeOp.modulo:
             return "mod"
 
-    def _eval(self, xctx: XPathContext) -> float:
-        lres, rres = self._eval_ops_float(xctx)
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_float_functions()
         if self.operator == MultiplicativeOp.multiply:
-            return lres * rres
+            return lambda xctx: left(xctx) * right(xctx)
         if self.operator == MultiplicativeOp.divide:
+            def divide(xctx: XPathContext) -> float:
+                lres = left(xctx)
+                try:
+                    return lres / right(xctx)
+                except ZeroDivisionError:
+                    return (float("nan") if lres == 0.0
+                            else copysign(float('inf'), lres))
+            return divide
+
+        def modulo(xctx: XPathContext) -> float:
+            lres = left(xctx)
             try:
-                return lres / rres
+                return copysign(lres % right(xctx), lres)
             except ZeroDivisionError:
-                return (float("nan") if lres == 0.0
-                        else copysign(float('inf'), lres))
-        try:
-            return copysign(lres % rres, lres)
-        except ZeroDivisionError:
-            return float('nan')
+                return float('nan')
+        return modulo
 
 
 class UnaryMinusExpr(UnaryExpr):
@@ -266,16 +578,32 @@ class UnaryMinusExpr(UnaryExpr):
     def _properties_str(self) -> str:
         return "-" if self.negate else "+"
 
-    def _eval(self, xctx: XPathContext) -> float:
-        res = self.expr._eval_float(xctx)
-        return -res if self.negate else res
+    def _compile(self) -> XPathFun:
+        fun = self.expr._float_function()
+        if self.negate:
+            return lambda xctx: -fun(xctx)
+        return fun
 
 
 class UnionExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        lres, rres = self._eval_ops(xctx)
-        return lres.union(rres)
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        return self.left._analyze(dctx) | self.right._analyze(dctx)
+
+    def _nodes_function(self) -> Optional[NodesFun]:
+        left = self.left._nodes_function()
+        right = self.right._nodes_function()
+        if left is None or right is None:
+            return None
+
+        def nodes(xctx: XPathContext) -> Iterator[InstanceNode]:
+            yield from left(xctx)
+            yield from right(xctx)
+        return nodes
+
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_functions()
+        return lambda xctx: left(xctx).union(right(xctx))
 
 
 class Literal(Expr):
@@ -286,8 +614,12 @@ class Literal(Expr):
     def _properties_str(self) -> str:
         return self.value
 
-    def _eval(self, xctx: XPathContext) -> str:
-        return self.value
+    def _constant(self) -> bool:
+        return True
+
+    def _compile(self) -> XPathFun:
+        value = self.value
+        return lambda xctx: value
 
 
 class Number(Expr):
@@ -298,21 +630,38 @@ class Number(Expr):
     def _properties_str(self) -> str:
         return str(self.value)
 
-    def _eval(self, xctx: XPathContext) -> float:
-        return float(self.value)
+    def _constant(self) -> bool:
+        return True
+
+    def _compile(self) -> XPathFun:
+        value = float(self.value)
+        return lambda xctx: value
 
 
 class PathExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        ns = self.left._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        res = NodeSet([])
-        for n in ns:
-            res = res.union(self.right._eval(xctx.update_cnode(n)))
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        res = set()
+        for n in self.left._analyze(dctx):
+            res |= self.right._analyze(dctx.update_cnode(n))
         return res
 
+    def _context_free(self) -> bool:
+        return self.left._context_free() and not self.right._uses_current()
+
+    def _cnode_free(self) -> bool:
+        return self.left._cnode_free()
+
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_functions()
+
+        def fun(xctx: XPathContext) -> XPathValue:
+            ns = left(xctx)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            return ns.bind(lambda n: right(xctx.update_cnode(n)))
+        return fun
+
 
 class FilterExpr(Expr):
 
@@ -323,23 +672,114 @@ class FilterExpr(Expr):
     def _children_str(self, indent) -> str:
         return self.primary._tree(indent) + self._predicates_str(indent)
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        res = self.primary._eval(xctx)
-        return self._apply_predicates(res, xctx)
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        return self._analyze_predicates(self.primary._analyze(dctx), dctx)
+
+    def _context_free(self) -> bool:
+        return self.primary._context_free() and not self._uses_current()
+
+    def _cnode_free(self) -> bool:
+        return self.primary._cnode_free()
+
+    def _uses_current(self) -> bool:
+        return self.primary._uses_current() or any(
+            [p._uses_current() for p in self.predicates])
+
+    def _compile(self) -> XPathFun:
+        primary = self.primary._function()
+        preds = self._predicates_function()
+        if preds is None:
+            return primary
+        return lambda xctx: preds(primary(xctx), xctx)
 
 
 class LocationPath(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        lres = self.left._eval(xctx)
-        ns = lres.bind(self.right._node_trans(xctx))
-        return self.right._apply_predicates(ns, xctx)
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        res = set()
+        for n in self.left._analyze(dctx):
+            res |= self.right._step_nodes(dctx.update_cnode(n))
+        return self.right._analyze_predicates(res, dctx)
+
+    def _context_free(self) -> bool:
+        return self.left._context_free() and not self.right._uses_current()
+
+    def _cnode_free(self) -> bool:
+        return self.left._cnode_free()
+
+    def _ups(self) -> Optional[int]:
+        left = self.left._ups()
+        right = self.right._ups()
+        return None if left is None or right is None else left + right
+
+    def _anchor(self) -> Optional[int]:
+        ups = self._ups()
+        if ups is not None:
+            return ups
+        return (None if self.right._uses_current() else
+                self.left._anchor())
+
+    def _nodes_function(self) -> Optional[NodesFun]:
+        if self.right.predicates:
+            return None
+        left = self.left._nodes_function()
+        if left is None:
+            return None
+        trans = self.right._node_trans()
+
+        def nodes(xctx: XPathContext) -> Iterator[InstanceNode]:
+            ntrans = trans(xctx)
+            for n in left(xctx):
+                yield from ntrans(n)
+        if not self._context_free():
+            return nodes
+        fun = self._function()
+        return lambda xctx: (
+            nodes(xctx) if _eval_cache.entries is None else iter(fun(xctx)))
+
+    def _compile(self) -> XPathFun:
+        left = self.left._function()
+        trans = self.right._node_trans()
+        preds = self.right._predicates_function()
+        keyed = self.right._keyed_function()
+        if keyed is not None:
+            def select(xctx: XPathContext) -> NodeSet:
+                ns = left(xctx)
+                res = keyed(ns, xctx)
+                if res is None:
+                    return preds(ns.bind(trans(xctx)), xctx)
+                return res
+            return self._cached(select) if self._context_free() else select
+
+        def nodes(xctx: XPathContext) -> NodeSet:
+            return left(xctx).bind(trans(xctx))
+        if preds is None:
+            return self._cached(nodes) if self._context_free() else nodes
+        if self._context_free():
+            return self._cached(lambda xctx: preds(nodes(xctx), xctx))
+        if self.left._context_free():   # predicates depend on current()
+            nodes = self._cached(nodes)
+        return lambda xctx: preds(nodes(xctx), xctx)
 
 
 class Root(Expr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        return NodeSet([xctx.cnode.top()])
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        root = dctx.cnode.schema_root()
+        dctx.ups.add(root)
+        return {root}
+
+    def _context_free(self) -> bool:
+        return True
+
+    def _cnode_free(self) -> bool:
+        return True
+
+    def _nodes_function(self) -> Optional[NodesFun]:
+        return lambda xctx: iter((xctx.cnode.top(),))
+
+    def _compile(self) -> XPathFun:
+        return lambda xctx: NodeSet([xctx.cnode.top()])
 
 
 class Step(Expr):
@@ -356,56 +796,175 @@ class Step(Expr):
     def _children_str(self, indent) -> str:
         return self._predicates_str(indent)
 
-    def _node_trans(self, xctx) -> NodeExpr:
-        qname = ((self.qname[0], xctx.origin.namespace) if
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        return self._analyze_predicates(self._step_nodes(dctx), dctx)
+
+    def _uses_current(self) -> bool:
+        return any([p._uses_current() for p in self.predicates])
+
+    def _ups(self) -> Optional[int]:
+        return (1 if self.axis == Axis.parent and self.qname is None
+                and not self.predicates else None)
+
+    def _anchor(self) -> Optional[int]:
+        return self._ups()
+
+    def _step_nodes(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        qname = ((self.qname[0], dctx.origin.ns) if
                  self.qname and self.qname[1] is None else self.qname)
-        return {
-            Axis.ancestor: lambda n, qn=qname: n._ancestors(qn),
-            Axis.ancestor_or_self:
-                lambda n, qn=qname: n._ancestors_or_self(qn),
-            Axis.child: lambda n, qn=qname: n._children(qn),
-            Axis.descendant: lambda n, qn=qname: n._descendants(qn),
-            Axis.descendant_or_self:
-                lambda n, qn=qname: n._descendants(qn, True),
-            Axis.following_sibling:
-                lambda n, qn=qname: n._following_siblings(qn),
-            Axis.parent: (
-                lambda n, qn=qname: [] if qn and qn != n.parent.qual_name
-                else n._parent()),
-            Axis.preceding_sibling:
-                lambda n, qn=qname: n._preceding_siblings(qn),
-            Axis.self:
-                lambda n, qn=qname: [] if qn and qn != n.qual_name else [n],
-        }[self.axis]
-
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        ns = NodeSet(self._node_trans(xctx)(xctx.cnode))
-        return self._apply_predicates(ns, xctx)
+        return dctx.cnode._axis_nodes(self.axis, qname, dctx.ups)
+
+    _axis_trans = {
+        Axis.ancestor: lambda n, qn: n._ancestors(qn),
+        Axis.ancestor_or_self: lambda n, qn: n._ancestors_or_self(qn),
+        Axis.child: lambda n, qn: n._children(qn),
+        Axis.descendant: lambda n, qn: n._descendants(qn),
+        Axis.descendant_or_self: lambda n, qn: n._descendants(qn, True),
+        Axis.following_sibling: lambda n, qn: n._following_siblings(qn),
+        Axis.parent: (
+            lambda n, qn: [] if qn and qn != n.parent.qual_name
+            else n._parent()),
+        Axis.preceding_sibling: lambda n, qn: n._preceding_siblings(qn),
+        Axis.self: lambda n, qn: [] if qn and qn != n.qual_name else [n],
+    }
+    """Node transformations for all axes."""
+
+    def _node_trans(self) -> Callable[[XPathContext], NodeExpr]:
+        """Return function that gives the receiver's node transformation.
+
+        Only the namespace of an unprefixed name depends on the context.
+        """
+        trans = self._axis_trans[self.axis]
+        if self.qname and self.qname[1] is None:
+            name = self.qname[0]
+            return lambda xctx: (
+                lambda n, qn=(name, xctx.origin.namespace): trans(n, qn))
+        qname = self.qname
+        ntrans = lambda n: trans(n, qname)
+        return lambda xctx: ntrans
+
+    def _nodes_function(self) -> Optional[NodesFun]:
+        if self.predicates:
+            return None
+        trans = self._node_trans()
+        return lambda xctx: iter(trans(xctx)(xctx.cnode))
+
+    def _key_predicates(self) -> List[Tuple[QualName, XPathFun]]:
+        """Return leading predicates of the form ``key = value``.
+
+        Only predicates comparing a child node with a value that doesn't
+        depend on the context node are considered.
+
+        Returns:
+            List of pairs consisting of the (possibly unprefixed) name of
+            the child and the compiled value.
+        """
+        res = []
+        for p in self.predicates:
+            if not isinstance(p, EqualityExpr) or p.negate:
+                break
+            for key, val in ((p.left, p.right), (p.right, p.left)):
+                if (isinstance(key, Step) and key.axis == Axis.child and
+                        key.qname and not key.predicates and
+                        val._cnode_free()):
+                    res.append((key.qname, val._function()))
+                    break
+            else:
+                break
+        return res
+
+    def _keyed_function(self) -> Optional[
+            Callable[[NodeSet, XPathContext], Optional[NodeSet]]]:
+        """Compile the receiver as a key lookup in a list, if possible.
+
+        The resulting function applies the receiver to all nodes of a
+        node-set. If the receiver selects list entries by values of all
+        list keys, the key index of the list is used instead of
+        evaluating the key predicates for every entry. The function
+        returns ``None`` if this is not possible for the given nodes.
+        """
+        if self.axis != Axis.child or not self.qname:
+            return None
+        kpreds = self._key_predicates()
+        if not kpreds:
+            return None
+        preds = self._predicates_function(len(kpreds))
+        name, prefix = self.qname
+
+        def fun(ns: NodeSet, xctx: XPathContext) -> Optional[NodeSet]:
+            dns = xctx.origin.namespace
+            kvals = {}
+            for (kname, kns), vfun in kpreds:
+                val = vfun(xctx)
+                if isinstance(val, NodeSet):
+                    texts = [str(n) for n in val if not n.is_internal()]
+                elif isinstance(val, str):
+                    texts = [val]
+                else:                   # numeric or boolean comparison
+                    return None
+                kqn = (kname, dns if kns is None else kns)
+                if kqn in kvals:
+                    texts = [t for t in kvals[kqn] if t in texts]
+                kvals[kqn] = texts
+            qname = (name, dns if prefix is None else prefix)
+            res = NodeSet([])
+            for n in ns:
+                sel = n._keyed_children(qname, kvals)
+                if sel is None:
+                    return None
+                res.extend(sel)
+            return res if preds is None else preds(res, xctx)
+        return fun
+
+    def _compile(self) -> XPathFun:
+        trans = self._node_trans()
+        preds = self._predicates_function()
+        keyed = self._keyed_function()
+        if keyed is not None:
+            def select(xctx: XPathContext) -> NodeSet:
+                res = keyed(NodeSet([xctx.cnode]), xctx)
+                if res is None:
+                    return preds(NodeSet(trans(xctx)(xctx.cnode)), xctx)
+                return res
+            return select
+        if preds is None:
+            return lambda xctx: NodeSet(trans(xctx)(xctx.cnode))
+        return lambda xctx: preds(NodeSet(trans(xctx)(xctx.cnode)), xctx)
 
 
 class FuncBitIsSet(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        ns = self.left._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        bit = self.right._eval_string(xctx)
-        try:
-            return bit in ns[0].value
-        except (IndexError, TypeError):
-            return False
+    def _compile(self) -> XPathFun:
+        left = self.left._function()
+        right = self.right._string_function()
+
+        def fun(xctx: XPathContext) -> bool:
+            ns = left(xctx)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            bit = right(xctx)
+            try:
+                return bit in ns[0].value
+            except (IndexError, TypeError):
+                return False
+        return fun
 
 
 class FuncBoolean(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return bool(self.expr._eval(xctx))
+    def _compile(self) -> XPathFun:
+        nodes = self.expr._nodes_function()
+        if nodes is not None:
+            return lambda xctx: next(nodes(xctx), None) is not None
+        fun = self.expr._function()
+        return lambda xctx: bool(fun(xctx))
 
 
 class FuncCeiling(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        return float(ceil(self.expr._eval_float(xctx)))
+    def _compile(self) -> XPathFun:
+        fun = self.expr._float_function()
+        return lambda xctx: float(ceil(fun(xctx)))
 
 
 class FuncConcat(Expr):
@@ -416,38 +975,62 @@ class FuncConcat(Expr):
     def _children_str(self, indent: int) -> str:
         return "".join([ex._tree(indent) for ex in self.parts])
 
-    def _eval(self, xctx: XPathContext) -> str:
-        return "".join([ex._eval_string(xctx) for ex in self.parts])
+    def _operands(self) -> List[Expr]:
+        return self.parts
+
+    def _compile(self) -> XPathFun:
+        funs = [ex._string_function() for ex in self.parts]
+        return lambda xctx: "".join([f(xctx) for f in funs])
 
 
 class FuncContains(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops_string(xctx)
-        return lres.find(rres) >= 0
+    def _compile(self) -> XPathFun:
+        return self._compile_string_op(lambda lres, rres: rres in lres)
 
 
 class FuncCount(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> int:
-        ns = self.expr._eval(xctx)
-        return float(len(ns))
+    def _compile(self) -> XPathFun:
+        fun = self.expr._function()
+        return lambda xctx: float(len(fun(xctx)))
 
 
 class FuncCurrent(Expr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        return NodeSet([xctx.origin])
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        return {dctx.origin}
+
+    def _uses_current(self) -> bool:
+        return True
+
+    def _cnode_free(self) -> bool:
+        return True
+
+    def _compile(self) -> XPathFun:
+        return lambda xctx: NodeSet([xctx.origin])
 
 
 class FuncDeref(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        ns = self.expr._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        ref = ns[0]
-        return NodeSet(ref._deref())
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        refs = self.expr._analyze(dctx)
+        dctx.deps.update(refs)
+        res = set()
+        for n in refs:
+            res |= n._deref_nodes(dctx)
+        return res
+
+    def _compile(self) -> XPathFun:
+        fun = self.expr._function()
+
+        def deref(xctx: XPathContext) -> NodeSet:
+            ns = fun(xctx)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            ref = ns[0]
+            return NodeSet(ref._deref())
+        return deref
 
 
 class FuncDerivedFrom(BinaryExpr):
@@ -462,51 +1045,70 @@ class FuncDerivedFrom(BinaryExpr):
         return ("OR-SELF, " if self.or_self
                 else "") + self.sctx.schema_data.namespace(self.mid)
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        ns = self.left._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        i = self.sctx.schema_data.translate_pname(
-            self.right._eval_string(xctx), self.sctx.text_mid)
-        for n in ns:
-            if not n.schema_node._is_identityref():
-                return False
-            if self.or_self and n.value == i:
-                return True
-            if self.sctx.schema_data.is_derived_from(n.value, i):
-                return True
-        return False
+    def _compile(self) -> XPathFun:
+        left = self.left._function()
+        right = self.right._string_function()
+        sdata = self.sctx.schema_data
+        mid = self.sctx.text_mid
+        or_self = self.or_self
+
+        def fun(xctx: XPathContext) -> bool:
+            ns = left(xctx)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            i = sdata.translate_pname(right(xctx), mid)
+            for n in ns:
+                if not n.schema_node._is_identityref():
+                    return False
+                if or_self and n.value == i:
+                    return True
+                if sdata.is_derived_from(n.value, i):
+                    return True
+            return False
+        return fun
 
 
 class FuncEnumValue(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        ns = self.expr._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        try:
-            node = ns[0]
-            return float(node.schema_node.type.enum[node.value])
-        except (AttributeError, IndexError, KeyError):
-            return float('nan')
+    def _compile(self) -> XPathFun:
+        fun = self.expr._function()
+
+        def enum_value(xctx: XPathContext) -> float:
+            ns = fun(xctx)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            try:
+                node = ns[0]
+                return float(node.schema_node.type.enum[node.value])
+            except (AttributeError, IndexError, KeyError):
+                return float('nan')
+        return enum_value
 
 
 class FuncFalse(Expr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return False
+    def _constant(self) -> bool:
+        return True
+
+    def _compile(self) -> XPathFun:
+        return lambda xctx: False
 
 
 class FuncFloor(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        return float(floor(self.expr._eval_float(xctx)))
+    def _compile(self) -> XPathFun:
+        fun = self.expr._float_function()
+        return lambda xctx: float(floor(fun(xctx)))
 
 
 class FuncLast(Expr):
 
-    def _eval(self, xctx: XPathContext) -> int:
-        return float(xctx.size)
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        dctx.deps.add(dctx.cnode)
+        return set()
+
+    def _compile(self) -> XPathFun:
+        return lambda xctx: float(xctx.size)
 
 
 class FuncName(UnaryExpr):
@@ -518,96 +1120,127 @@ class FuncName(UnaryExpr):
     def _properties_str(self) -> str:
         return "LOCAL" if self.local else ""
 
-    def _eval(self, xctx: XPathContext) -> str:
-        if self.expr is None:
-            node = xctx.cnode
-        else:
-            ns = self.expr._eval(xctx)
-            try:
-                node = ns[0]
-            except TypeError:
-                raise XPathTypeError(str(ns))
-            except IndexError:
+    def _compile(self) -> XPathFun:
+        fun = self.expr._function() if self.expr else None
+        local = self.local
+
+        def name(xctx: XPathContext) -> str:
+            if fun is None:
+                node = xctx.cnode
+            else:
+                ns = fun(xctx)
+                try:
+                    node = ns[0]
+                except TypeError:
+                    raise XPathTypeError(str(ns))
+                except IndexError:
+                    return ""
+            if node.path == ():
                 return ""
-        if node.path is ():
-            return ""
-        if self.local:
-            p, s, loc = node.name.partition(":")
-            return loc if s else p
-        return node.name
+            if local:
+                p, s, loc = node.name.partition(":")
+                return loc if s else p
+            return node.name
+        return name
 
 
 class FuncNormalizeSpace(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string = self.expr._eval_string(xctx) if self.expr else str(xctx.cnode)
-        return " ".join(string.strip().split())
+    def _compile(self) -> XPathFun:
+        fun = (self.expr._string_function() if self.expr
+               else lambda xctx: str(xctx.cnode))
+        return lambda xctx: " ".join(fun(xctx).strip().split())
 
 
 class FuncNot(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return not(self.expr._eval(xctx))
+    def _compile(self) -> XPathFun:
+        nodes = self.expr._nodes_function()
+        if nodes is not None:
+            return lambda xctx: next(nodes(xctx), None) is None
+        fun = self.expr._function()
+        return lambda xctx: not fun(xctx)
 
 
 class FuncNumber(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
+    def _compile(self) -> XPathFun:
         if self.expr is None:
-            try:
-                return float(xctx.cnode.value)
-            except ValueError:
-                return float('nan')
-        return self.expr._eval_float(xctx)
+            return lambda xctx: _to_float(xctx.cnode.value)
+        return self.expr._float_function()
 
 
 class FuncPosition(Expr):
 
-    def _eval(self, xctx: XPathContext) -> int:
-        return xctx.position
+    def _analyze(self, dctx: DependencyContext) -> Set["SchemaNode"]:
+        dctx.deps.add(dctx.cnode)
+        return set()
+
+    def _compile(self) -> XPathFun:
+        return lambda xctx: xctx.position
 
 
 class FuncReMatch(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops_string(xctx)
+    @staticmethod
+    def _regex(pattern: str):
         try:
-            return re.match(XMLToPython(rres), lres) is not None
+            return re.compile(XMLToPython(pattern))
         except RegularExpressionError:
-            raise InvalidArgument(rres) from None
+            raise InvalidArgument(pattern) from None
+
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_string_functions()
+        if self.right._constant():      # translate the pattern only once
+            try:
+                regex = self._regex(right(None))
+            except InvalidArgument:
+                pass
+            else:
+                return lambda xctx: regex.match(left(xctx)) is not None
+
+        def fun(xctx: XPathContext) -> bool:
+            lres = left(xctx)
+            return self._regex(right(xctx)).match(lres) is not None
+        return fun
 
 
 class FuncRound(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        dec = decimal.Decimal(self.expr._eval_float(xctx))
-        try:
-            return float(dec.to_integral_value(
-                decimal.ROUND_HALF_UP if dec > 0 else decimal.ROUND_HALF_DOWN))
-        except decimal.InvalidOperation:
-            return float('nan')
+    def _compile(self) -> XPathFun:
+        fun = self.expr._float_function()
+
+        def rnd(xctx: XPathContext) -> float:
+            dec = decimal.Decimal(fun(xctx))
+            try:
+                return float(dec.to_integral_value(
+                    decimal.ROUND_HALF_UP if dec > 0
+                    else decimal.ROUND_HALF_DOWN))
+            except decimal.InvalidOperation:
+                return float('nan')
+        return rnd
 
 
 class FuncStartsWith(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops_string(xctx)
-        return lres.startswith(rres)
+    def _compile(self) -> XPathFun:
+        return self._compile_string_op(str.startswith)
 
 
 class FuncString(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
+    def _compile(self) -> XPathFun:
         if self.expr is None:
-            return str(xctx.cnode)
-        return self.expr._eval_string(xctx)
+            return lambda xctx: str(xctx.cnode)
+        return self.expr._string_function()
 
 
 class FuncStringLength(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string = self.expr._eval_string(xctx) if self.expr else str(xctx.cnode)
-        return float(len(string))
+    def _compile(self) -> XPathFun:
+        fun = (self.expr._string_function() if self.expr
+               else lambda xctx: str(xctx.cnode))
+        return lambda xctx: float(len(fun(xctx)))
 
 
 class FuncSubstring(BinaryExpr):
@@ -620,49 +1253,64 @@ class FuncSubstring(BinaryExpr):
     def _children_str(self, indent: int) -> str:
         return super()._children_str(indent) + self.length._tree(indent)
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string = self.left._eval_string(xctx)
-        rres = self.right._eval_float(xctx)
-        try:
-            start = round(rres) - 1
-        except (ValueError, OverflowError):
-            return "" if self.length or rres != float("-inf") else string
-        if self.length is None:
-            return string[max(start, 0):]
-        length = self.length._eval_float(xctx)
-        try:
-            end = start + round(length)
-        except (ValueError, OverflowError):
-            return string[max(start, 0):] if length == float('inf') else ""
-        return string[max(start, 0):end]
+    def _operands(self) -> List[Expr]:
+        return super()._operands() + ([self.length] if self.length else [])
+
+    def _compile(self) -> XPathFun:
+        left = self.left._string_function()
+        right = self.right._float_function()
+        lfun = self.length._float_function() if self.length else None
+
+        def substring(xctx: XPathContext) -> str:
+            string = left(xctx)
+            rres = right(xctx)
+            try:
+                start = round(rres) - 1
+            except (ValueError, OverflowError):
+                return "" if lfun or rres != float("-inf") else string
+            if lfun is None:
+                return string[max(start, 0):]
+            length = lfun(xctx)
+            try:
+                end = start + round(length)
+            except (ValueError, OverflowError):
+                return string[max(start, 0):] if length == float('inf') else ""
+            return string[max(start, 0):end]
+        return substring
 
 
 class FuncSubstringAfter(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        lres, rres = self._eval_ops_string(xctx)
-        ind = lres.find(rres)
-        return lres[ind + len(rres):] if ind >= 0 else ""
+    def _compile(self) -> XPathFun:
+        def after(lres: str, rres: str) -> str:
+            ind = lres.find(rres)
+            return lres[ind + len(rres):] if ind >= 0 else ""
+        return self._compile_string_op(after)
 
 
 class FuncSubstringBefore(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        lres, rres = self._eval_ops_string(xctx)
-        ind = lres.find(rres)
-        return lres[:ind] if ind >= 0 else ""
+    def _compile(self) -> XPathFun:
+        def before(lres: str, rres: str) -> str:
+            ind = lres.find(rres)
+            return lres[:ind] if ind >= 0 else ""
+        return self._compile_string_op(before)
 
 
 class FuncSum(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        ns = self.expr._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        try:
-            return float(sum([n.value for n in ns]))
-        except TypeError:
-            return float('nan')
+    def _compile(self) -> XPathFun:
+        fun = self.expr._function()
+
+        def fsum(xctx: XPathContext) -> float:
+            ns = fun(xctx)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            try:
+                return float(sum([n.value for n in ns]))
+            except TypeError:
+                return float('nan')
+        return fsum
 
 
 class FuncTranslate(BinaryExpr):
@@ -674,14 +1322,58 @@ class FuncTranslate(BinaryExpr):
     def _children_str(self, indent: int) -> str:
         return super()._children_str(indent) + self.nchars._tree(indent)
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string, old = self._eval_ops_string(xctx)
-        new = self.nchars._eval_string(xctx)[:len(old)]
-        ttab = str.maketrans(old[:len(new)], new, old[len(new):])
-        return string.translate(ttab)
+    def _operands(self) -> List[Expr]:
+        return super()._operands() + [self.nchars]
+
+    @staticmethod
+    def _table(old: str, new: str) -> dict:
+        new = new[:len(old)]
+        return str.maketrans(old[:len(new)], new, old[len(new):])
+
+    def _compile(self) -> XPathFun:
+        left, right = self._ops_string_functions()
+        nchars = self.nchars._string_function()
+        if self.right._constant() and self.nchars._constant():
+            ttab = self._table(right(None), nchars(None))
+            return lambda xctx: left(xctx).translate(ttab)
+        return lambda xctx: left(xctx).translate(
+            self._table(right(xctx), nchars(xctx)))
 
 
 class FuncTrue(Expr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
+    def _constant(self) -> bool:
         return True
+
+    def _compile(self) -> XPathFun:
+        return lambda xctx: True
+
+
+_numeric_exprs = (
+    AdditiveExpr, FilterExpr, FuncCeiling, FuncCount, FuncEnumValue,
+    FuncFloor, FuncLast, FuncNumber, FuncPosition, FuncRound,
+    FuncStringLength, FuncSum, MultiplicativeExpr, Number, UnaryMinusExpr)
+"""Expressions that may yield a number, i.e. a position in predicates."""
+
+
+def _to_float(val: XPathValue) -> float:
+    """Convert an XPath value to number."""
+    try:
+        return float(val)
+    except ValueError:
+        return float('nan')
+
+
+def _to_string(val: XPathValue) -> str:
+    """Convert an XPath value to string."""
+    if isinstance(val, float):
+        try:
+            if int(val) == val:
+                return str(int(val))
+        except OverflowError:
+            return "Infinity" if val > 0 else "-Infinity"
+        except ValueError:
+            return "NaN"
+    if isinstance(val, bool):
+        return str(val).lower()
+    return str(val)